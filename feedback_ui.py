@@ -2,33 +2,87 @@
 # Developed by Fábio Ferreira (https://x.com/fabiomlferreira)
 # Inspired by/related to dotcursorrules.com (https://dotcursorrules.com/)
 import argparse
+import codecs
+import collections
+import functools
 import html
-import base64
+import io
 import hashlib
 import json
+import logging
 import mimetypes
+import mmap
 import os
-import re
+import signal
 import subprocess
 import sys
 import threading
+import time
 from typing import Optional, TypedDict
-from io import BytesIO
 
-import psutil
-from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings, QMimeData, QUrl
-from PySide6.QtGui import QTextCursor, QIcon, QKeyEvent, QFont, QFontDatabase, QPalette, QColor, QPixmap, QDragEnterEvent, QDropEvent
+from PySide6.QtCore import Qt, Signal, QObject, QTimer, QSettings, QSocketNotifier, QMimeData, QUrl, QRunnable, QThreadPool, QBuffer, QByteArray, QIODevice, QCoreApplication, QEvent
+from PySide6.QtGui import QTextCursor, QIcon, QKeyEvent, QFont, QFontDatabase, QPalette, QColor, QPixmap, QImage, QImageReader, QDragEnterEvent, QDropEvent
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QLabel, QLineEdit, QPushButton, QCheckBox, QTextEdit, QTextBrowser, QGroupBox, QGridLayout, QFileDialog, QMessageBox, QScrollArea, QFrame, QSizePolicy
+    QLabel, QLineEdit, QPushButton, QCheckBox, QTextEdit, QPlainTextEdit, QTextBrowser, QGroupBox, QGridLayout, QFileDialog, QMessageBox, QScrollArea, QFrame, QSizePolicy
 )
 
 # Import bilingual text manager
 from i18n import get_text_manager
 
+logger = logging.getLogger(__name__)
+
+# Directory of this script, where the stylesheets and images live
+_SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+_ICON_PATH = os.path.join(_SCRIPT_DIR, "images", "feedback.png")
+
+# Prefer the SIMD-accelerated pybase64 when available, fall back to stdlib base64
+try:
+    import pybase64
+
+    def b64encode_bytes(data) -> bytes:
+        return pybase64.b64encode(data)
+
+    def b64encode_str(data: bytes) -> str:
+        return pybase64.b64encode_as_string(data)
+
+    def b64decode(data: str) -> bytes:
+        return pybase64.b64decode(data, validate=False)
+except ImportError:
+    import base64
+
+    def b64encode_bytes(data) -> bytes:
+        return base64.b64encode(data)
+
+    def b64encode_str(data: bytes) -> str:
+        return base64.b64encode(data).decode('ascii')
+
+    def b64decode(data: str) -> bytes:
+        return base64.b64decode(data)
+
+# Multiple of 3, so every chunk encodes without padding
+_B64_CHUNK_SIZE = 3 * 1024 * 1024
+
+
+def b64encode_data_url(prefix: str, data: bytes) -> str:
+    """Build prefix + base64(data), encoding large inputs chunk by chunk into one preallocated buffer."""
+    if len(data) <= _B64_CHUNK_SIZE:
+        return prefix + b64encode_str(data)
+
+    header = prefix.encode('ascii')
+    out = bytearray(len(header) + (len(data) + 2) // 3 * 4)
+    out[:len(header)] = header
+    view = memoryview(data)
+    position = len(header)
+    for start in range(0, len(data), _B64_CHUNK_SIZE):
+        chunk = b64encode_bytes(view[start:start + _B64_CHUNK_SIZE])
+        out[position:position + len(chunk)] = chunk
+        position += len(chunk)
+    return out.decode('ascii')
+
 
 class FeedbackResult(TypedDict):
-    command_logs: str
+    logs: str
     interactive_feedback: str
     images: list[dict]  # List of {"filename": str, "data": str (base64)}
     text_files: list[dict]  # List of {"filename": str, "content": str, "path": str, "size": int, "encoding": str}
@@ -39,15 +93,38 @@ class FeedbackConfig(TypedDict):
     execute_automatically: bool
 
 
+@functools.lru_cache(maxsize=None)
+def _get_windows_build() -> int:
+    """Windows build number; it can't change while the process runs."""
+    return sys.getwindowsversion().build
+
+
+@functools.lru_cache(maxsize=None)
+def _get_title_bar_api():
+    """Load the Win32 functions used by set_dark_title_bar, binding their prototypes once."""
+    import ctypes
+    from ctypes import wintypes
+
+    DwmSetWindowAttribute = ctypes.WinDLL("dwmapi").DwmSetWindowAttribute
+    DwmSetWindowAttribute.argtypes = [wintypes.HWND, wintypes.DWORD, wintypes.LPCVOID, wintypes.DWORD]
+    DwmSetWindowAttribute.restype = ctypes.c_long  # HRESULT
+
+    SetWindowPos = ctypes.WinDLL("user32").SetWindowPos
+    SetWindowPos.argtypes = [wintypes.HWND, wintypes.HWND, ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, wintypes.UINT]
+    SetWindowPos.restype = wintypes.BOOL
+
+    return DwmSetWindowAttribute, SetWindowPos
+
+
 def set_dark_title_bar(widget: QWidget, dark_title_bar: bool) -> None:
     # Ensure we're on Windows
     if sys.platform != "win32":
         return
 
-    from ctypes import windll, c_uint32, byref
+    from ctypes import c_uint32, byref, sizeof
 
     # Get Windows build number
-    build_number = sys.getwindowsversion().build
+    build_number = _get_windows_build()
     if build_number < 17763:  # Windows 10 1809 minimum
         return
 
@@ -59,19 +136,15 @@ def set_dark_title_bar(widget: QWidget, dark_title_bar: bool) -> None:
     # Set the property (True if dark_title_bar != 0, False otherwise)
     widget.setProperty("DarkTitleBar", dark_title_bar)
 
-    # Load dwmapi.dll and call DwmSetWindowAttribute
-    dwmapi = windll.dwmapi
-    hwnd = widget.winId()  # Get the window handle
+    DwmSetWindowAttribute, SetWindowPos = _get_title_bar_api()
+    hwnd = int(widget.winId())  # Get the window handle
     attribute = 20 if build_number >= 18985 else 19  # Use newer attribute for newer builds
     c_dark_title_bar = c_uint32(dark_title_bar)  # Convert to C-compatible uint32
-    dwmapi.DwmSetWindowAttribute(hwnd, attribute, byref(c_dark_title_bar), 4)
+    DwmSetWindowAttribute(hwnd, attribute, byref(c_dark_title_bar), sizeof(c_dark_title_bar))
 
-    # HACK: Create a 1x1 pixel frameless window to force redraw
-    temp_widget = QWidget(None, Qt.FramelessWindowHint)
-    temp_widget.resize(1, 1)
-    temp_widget.move(widget.pos())
-    temp_widget.show()
-    temp_widget.deleteLater()  # Safe deletion in Qt event loop
+    # Have Windows re-evaluate the non-client area so the title bar repaints right away
+    SWP_NOSIZE, SWP_NOMOVE, SWP_NOZORDER, SWP_FRAMECHANGED = 0x0001, 0x0002, 0x0004, 0x0020
+    SetWindowPos(hwnd, None, 0, 0, 0, 0, SWP_NOMOVE | SWP_NOSIZE | SWP_NOZORDER | SWP_FRAMECHANGED)
 
 
 # Modern color scheme constants
@@ -84,6 +157,8 @@ TEXT_MUTED = QColor(113, 113, 122)  # Muted text
 ACCENT_COLOR = QColor(99, 102, 241)  # Indigo accent
 SUCCESS_COLOR = QColor(34, 197, 94)  # Green for success
 ERROR_COLOR = QColor(239, 68, 68)  # Red for errors
+DARK_SHADE = QColor(18, 18, 20)  # Palette "Dark" role
+SHADOW_COLOR = QColor(0, 0, 0)  # Palette "Shadow" role
 
 # Light theme color constants
 LIGHT_PRIMARY_BG = QColor(255, 255, 255)  # Pure white background
@@ -95,9 +170,19 @@ LIGHT_TEXT_MUTED = QColor(148, 163, 184)  # Light gray muted text
 LIGHT_ACCENT_COLOR = QColor(99, 102, 241)  # Same indigo accent
 LIGHT_SUCCESS_COLOR = QColor(34, 197, 94)  # Same green
 LIGHT_ERROR_COLOR = QColor(239, 68, 68)  # Same red
+LIGHT_DARK_SHADE = QColor(200, 200, 200)  # Palette "Dark" role
+LIGHT_SHADOW_COLOR = QColor(150, 150, 150)  # Palette "Shadow" role
+
+# Palettes are built on first use (they start from the application palette) and copied afterwards
+_DARK_PALETTE: Optional[QPalette] = None
+_LIGHT_PALETTE: Optional[QPalette] = None
 
 
 def get_dark_mode_palette(app: QApplication):
+    global _DARK_PALETTE
+    if _DARK_PALETTE is not None:
+        return QPalette(_DARK_PALETTE)
+
     darkPalette = app.palette()
     darkPalette.setColor(QPalette.Window, PRIMARY_BG)
     darkPalette.setColor(QPalette.WindowText, TEXT_PRIMARY)
@@ -107,8 +192,8 @@ def get_dark_mode_palette(app: QApplication):
 
     darkPalette.setColor(QPalette.Text, TEXT_PRIMARY)
     darkPalette.setColor(QPalette.Disabled, QPalette.Text, TEXT_MUTED)
-    darkPalette.setColor(QPalette.Dark, QColor(18, 18, 20))
-    darkPalette.setColor(QPalette.Shadow, QColor(0, 0, 0))
+    darkPalette.setColor(QPalette.Dark, DARK_SHADE)
+    darkPalette.setColor(QPalette.Shadow, SHADOW_COLOR)
     darkPalette.setColor(QPalette.Button, SECONDARY_BG)
     darkPalette.setColor(QPalette.ButtonText, TEXT_PRIMARY)
     darkPalette.setColor(QPalette.Disabled, QPalette.ButtonText, TEXT_MUTED)
@@ -119,10 +204,15 @@ def get_dark_mode_palette(app: QApplication):
     darkPalette.setColor(QPalette.HighlightedText, TEXT_PRIMARY)
     darkPalette.setColor(QPalette.Disabled, QPalette.HighlightedText, TEXT_MUTED)
     darkPalette.setColor(QPalette.PlaceholderText, TEXT_MUTED)
-    return darkPalette
+    _DARK_PALETTE = darkPalette
+    return QPalette(darkPalette)
 
 
 def get_light_mode_palette(app: QApplication):
+    global _LIGHT_PALETTE
+    if _LIGHT_PALETTE is not None:
+        return QPalette(_LIGHT_PALETTE)
+
     lightPalette = app.palette()
     lightPalette.setColor(QPalette.Window, LIGHT_PRIMARY_BG)
     lightPalette.setColor(QPalette.WindowText, LIGHT_TEXT_PRIMARY)
@@ -132,8 +222,8 @@ def get_light_mode_palette(app: QApplication):
 
     lightPalette.setColor(QPalette.Text, LIGHT_TEXT_PRIMARY)
     lightPalette.setColor(QPalette.Disabled, QPalette.Text, LIGHT_TEXT_MUTED)
-    lightPalette.setColor(QPalette.Dark, QColor(200, 200, 200))
-    lightPalette.setColor(QPalette.Shadow, QColor(150, 150, 150))
+    lightPalette.setColor(QPalette.Dark, LIGHT_DARK_SHADE)
+    lightPalette.setColor(QPalette.Shadow, LIGHT_SHADOW_COLOR)
     lightPalette.setColor(QPalette.Button, LIGHT_SECONDARY_BG)
     lightPalette.setColor(QPalette.ButtonText, LIGHT_TEXT_PRIMARY)
     lightPalette.setColor(QPalette.Disabled, QPalette.ButtonText, LIGHT_TEXT_MUTED)
@@ -144,61 +234,75 @@ def get_light_mode_palette(app: QApplication):
     lightPalette.setColor(QPalette.HighlightedText, LIGHT_TEXT_PRIMARY)
     lightPalette.setColor(QPalette.Disabled, QPalette.HighlightedText, LIGHT_TEXT_MUTED)
     lightPalette.setColor(QPalette.PlaceholderText, LIGHT_TEXT_MUTED)
-    return lightPalette
+    _LIGHT_PALETTE = lightPalette
+    return QPalette(lightPalette)
 
 
+# Built on first use, since the system fixed font can only be queried once a QApplication exists
+_LOG_FONT: Optional[QFont] = None
+
+
+def get_log_font() -> QFont:
+    global _LOG_FONT
+    if _LOG_FONT is None:
+        font = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        font.setPointSize(9)
+        _LOG_FONT = font
+    return _LOG_FONT
+
+
+@functools.lru_cache(maxsize=None)
 def get_modern_stylesheet():
-    """Modern flat design stylesheet"""
+    """Modern flat design stylesheet (read from disk once per process)"""
     # Read stylesheet from file
-    stylesheet_path = os.path.join(os.path.dirname(__file__), "feedback_dark_styles.qss")
+    stylesheet_path = os.path.join(_SCRIPT_DIR, "feedback_dark_styles.qss")
     try:
         with open(stylesheet_path, "r", encoding="utf-8") as f:
             return f.read()
     except FileNotFoundError:
-        print(f"Error: Stylesheet file not found at {stylesheet_path}")
+        logger.error("Stylesheet file not found at %s", stylesheet_path)
         return ""
 
 
+@functools.lru_cache(maxsize=None)
 def get_light_stylesheet():
-    """Modern flat design stylesheet for light theme"""
+    """Modern flat design stylesheet for light theme (read from disk once per process)"""
     # Read stylesheet from file
-    stylesheet_path = os.path.join(os.path.dirname(__file__), "feedback_light_styles.qss")
+    stylesheet_path = os.path.join(_SCRIPT_DIR, "feedback_light_styles.qss")
     try:
         with open(stylesheet_path, "r", encoding="utf-8") as f:
             return f.read()
     except FileNotFoundError:
-        print(f"Error: Stylesheet file not found at {stylesheet_path}")
+        logger.error("Stylesheet file not found at %s", stylesheet_path)
         return ""
 
 
 def kill_tree(process: subprocess.Popen):
-    killed: list[psutil.Process] = []
-    parent = psutil.Process(process.pid)
-    for proc in parent.children(recursive=True):
+    # Commands run in their own session/process group (see _run_command), so the whole tree
+    # is stopped with one OS call instead of walking its descendants
+    if sys.platform == "win32":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            creationflags=subprocess.CREATE_NO_WINDOW,
+            check=False,
+        )
+    else:
+        # The group id is the leader's pid, which stays valid for the group even after the shell exited
         try:
-            proc.kill()
-            killed.append(proc)
-        except psutil.Error:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
             pass
     try:
-        parent.kill()
-    except psutil.Error:
-        pass
-    killed.append(parent)
-
-    # Terminate any remaining processes
-    for proc in killed:
-        try:
-            if proc.is_running():
-                proc.terminate()
-        except psutil.Error:
-            pass
+        process.wait(timeout=3)
+    except subprocess.TimeoutExpired:
+        logger.warning("Command process %s did not exit after being killed", process.pid)
 
 
-def get_user_environment() -> dict[str, str]:
-    if sys.platform != "win32":
-        return os.environ.copy()
-
+@functools.lru_cache(maxsize=None)
+def _get_environment_block_api():
+    """Load the Win32 functions used by get_user_environment, binding their prototypes once."""
     import ctypes
     from ctypes import wintypes
 
@@ -207,9 +311,6 @@ def get_user_environment() -> dict[str, str]:
     userenv = ctypes.WinDLL("userenv")
     kernel32 = ctypes.WinDLL("kernel32")
 
-    # Constants
-    TOKEN_QUERY = 0x0008
-
     # Function prototypes
     OpenProcessToken = advapi32.OpenProcessToken
     OpenProcessToken.argtypes = [wintypes.HANDLE, wintypes.DWORD, ctypes.POINTER(wintypes.HANDLE)]
@@ -231,6 +332,24 @@ def get_user_environment() -> dict[str, str]:
     CloseHandle.argtypes = [wintypes.HANDLE]
     CloseHandle.restype = wintypes.BOOL
 
+    return OpenProcessToken, CreateEnvironmentBlock, DestroyEnvironmentBlock, GetCurrentProcess, CloseHandle
+
+
+# The environment doesn't change while the UI is open, so build it once; callers must not modify the result
+@functools.lru_cache(maxsize=1)
+def get_user_environment() -> dict[str, str]:
+    if sys.platform != "win32":
+        return os.environ.copy()
+
+    import ctypes
+    from ctypes import wintypes
+
+    # Constants
+    TOKEN_QUERY = 0x0008
+
+    OpenProcessToken, CreateEnvironmentBlock, DestroyEnvironmentBlock, GetCurrentProcess, CloseHandle = \
+        _get_environment_block_api()
+
     # Get process token
     token = wintypes.HANDLE()
     if not OpenProcessToken(GetCurrentProcess(), TOKEN_QUERY, ctypes.byref(token)):
@@ -245,29 +364,25 @@ def get_user_environment() -> dict[str, str]:
         try:
             # Convert environment block to list of strings
             result = {}
-            env_ptr = ctypes.cast(environment, ctypes.POINTER(ctypes.c_wchar))
+            base_address = environment.value
+            wchar_size = ctypes.sizeof(ctypes.c_wchar)
             offset = 0
 
             while True:
-                # Get string at current offset
-                current_string = ""
-                while env_ptr[offset] != "\0":
-                    current_string += env_ptr[offset]
-                    offset += 1
-
-                # Skip null terminator
-                offset += 1
+                # wstring_at stops at the null terminator, so each call reads one whole "key=value" string
+                current_string = ctypes.wstring_at(base_address + offset * wchar_size)
 
                 # Break if we hit double null terminator
                 if not current_string:
                     break
 
-                equal_index = current_string.index("=")
-                if equal_index == -1:
+                # Skip the string (in UTF-16 code units, to account for surrogate pairs) and its null terminator
+                offset += len(current_string.encode("utf-16-le", "surrogatepass")) // wchar_size + 1
+
+                key, separator, value = current_string.partition("=")
+                if not separator:
                     continue
 
-                key = current_string[:equal_index]
-                value = current_string[equal_index + 1:]
                 result[key] = value
 
             return result
@@ -279,6 +394,106 @@ def get_user_environment() -> dict[str, str]:
         CloseHandle(token)
 
 
+# Supported text/code file extensions
+_TEXT_EXTENSIONS = frozenset({
+    # Programming languages
+    '.py', '.pyw', '.pyi',  # Python
+    '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs',  # JavaScript/TypeScript
+    '.java',  # Java
+    '.c', '.cpp', '.cxx', '.cc', '.h', '.hpp', '.hxx',  # C/C++
+    '.cs', '.csx',  # C#
+    '.go',  # Go
+    '.rs',  # Rust
+    '.swift',  # Swift
+    '.kt', '.kts',  # Kotlin
+    '.scala', '.sc',  # Scala
+    '.rb', '.rbw',  # Ruby
+    '.php', '.phtml',  # PHP
+    '.pl', '.pm',  # Perl
+    '.r', '.R',  # R
+    '.m',  # MATLAB/Objective-C
+    '.lua',  # Lua
+    '.dart',  # Dart
+    '.mm',  # Objective-C++
+    
+    # Web development
+    '.html', '.htm', '.xhtml',  # HTML
+    '.css', '.scss', '.sass', '.less', '.styl',  # CSS
+    '.xml', '.xsl', '.xsd',  # XML
+    '.json', '.jsonc',  # JSON
+    '.yaml', '.yml',  # YAML
+    '.toml',  # TOML
+    
+    # Scripts and config
+    '.sh', '.bash', '.zsh', '.fish',  # Shell scripts
+    '.ps1',  # PowerShell
+    '.bat', '.cmd',  # Windows batch
+    '.sql',  # SQL
+    '.graphql', '.gql',  # GraphQL
+    
+    # Documents
+    '.md', '.markdown', '.mdown', '.mdx',  # Markdown
+    '.rst',  # reStructuredText
+    '.tex', '.cls', '.sty',  # LaTeX
+    '.txt', '.text',  # Plain text
+    '.log',  # Log files
+    
+    # Config files
+    '.ini', '.cfg', '.conf',  # INI/Config
+    '.properties',  # Properties
+    '.env', '.environment',  # Environment
+})
+
+# Extension-less files that are treated as text
+_TEXT_BASENAMES = frozenset({'makefile', 'dockerfile'})
+
+
+@functools.lru_cache(maxsize=None)
+def _image_extensions() -> frozenset[str]:
+    """Extensions that mimetypes maps to image/* types; built on first use so the MIME database loads lazily."""
+    mimetypes.init()
+    return frozenset(ext for ext, mime_type in mimetypes.types_map.items() if mime_type.startswith('image/'))
+
+
+# Comprehensive file filter for the add-file dialog
+_FILE_DIALOG_FILTER = (
+    "All Supported Files ("
+    "*.png *.jpg *.jpeg *.gif *.bmp *.webp "  # Images
+    "*.py *.pyw *.pyi *.js *.jsx *.ts *.tsx *.mjs *.cjs "  # Python, JavaScript/TypeScript
+    "*.java *.c *.cpp *.cxx *.cc *.h *.hpp *.hxx *.cs *.csx "  # Java, C/C++, C#
+    "*.go *.rs *.swift *.kt *.kts *.scala *.sc *.rb *.rbw "  # Go, Rust, Swift, Kotlin, Scala, Ruby
+    "*.php *.phtml *.pl *.pm *.r *.R *.m *.lua *.dart *.mm "  # PHP, Perl, R, MATLAB, Lua, Dart, Objective-C++
+    "*.html *.htm *.xhtml *.css *.scss *.sass *.less *.styl "  # Web files
+    "*.xml *.xsl *.xsd *.json *.jsonc *.yaml *.yml *.toml "  # Data files
+    "*.sh *.bash *.zsh *.fish *.ps1 *.bat *.cmd *.sql *.graphql *.gql "  # Scripts
+    "*.md *.markdown *.mdown *.mdx *.rst *.tex *.cls *.sty *.txt *.text *.log "  # Documents
+    "*.ini *.cfg *.conf *.properties *.env *.environment "  # Config files
+    ");;"
+    "Images (*.png *.jpg *.jpeg *.gif *.bmp *.webp);;"
+    "Source Code ("
+    "*.py *.pyw *.pyi *.js *.jsx *.ts *.tsx *.mjs *.cjs *.java *.c *.cpp *.cxx *.cc *.h *.hpp *.hxx "
+    "*.cs *.csx *.go *.rs *.swift *.kt *.kts *.scala *.sc *.rb *.rbw *.php *.phtml *.pl *.pm "
+    "*.r *.R *.m *.lua *.dart *.mm"
+    ");;"
+    "Web Files (*.html *.htm *.xhtml *.css *.scss *.sass *.less *.styl *.xml *.xsl *.xsd *.json *.jsonc *.yaml *.yml *.toml);;"
+    "Scripts (*.sh *.bash *.zsh *.fish *.ps1 *.bat *.cmd *.sql *.graphql *.gql);;"
+    "Documents (*.md *.markdown *.mdown *.mdx *.rst *.tex *.cls *.sty *.txt *.text *.log);;"
+    "Config Files (*.ini *.cfg *.conf *.properties *.env *.environment)"
+)
+
+# Tab icon for each text file extension
+_FILE_ICON_MAP = {
+    '.py': '🐍', '.pyw': '🐍', '.pyi': '🐍',
+    '.js': '🟨', '.jsx': '🟨', '.ts': '🔷', '.tsx': '🔷',
+    '.java': '☕', '.c': '🔧', '.cpp': '🔧', '.h': '🔧',
+    '.cs': '🔷', '.go': '🐹', '.rs': '🦀', '.swift': '🍎',
+    '.php': '🐘', '.rb': '💎', '.kt': '🎯', '.scala': '🔺',
+    '.html': '🌐', '.css': '🎨', '.xml': '📄', '.json': '📋',
+    '.md': '📝', '.txt': '📄', '.sql': '🗃️', '.sh': '⚡',
+    '.yaml': '⚙️', '.yml': '⚙️', '.toml': '⚙️', '.ini': '⚙️'
+}
+
+
 class FilePreviewWidget(QWidget):
     """Base widget for file preview with elegant design inspired by Cursor."""
     
@@ -287,6 +502,7 @@ class FilePreviewWidget(QWidget):
         self.file_data = file_data
         self.file_type = file_type  # "image" or "text"
         self.parent_ui = parent
+        self._display_name = self._compute_tab_filename()
         self._setup_ui()
     
     def _setup_ui(self):
@@ -330,6 +546,10 @@ class FilePreviewWidget(QWidget):
         self.filename_label.setCursor(Qt.CursorShape.PointingHandCursor)
     
     def _get_tab_filename(self):
+        """Get the tab-friendly filename computed when the widget was created."""
+        return self._display_name
+    
+    def _compute_tab_filename(self):
         """Get a tab-friendly filename with smart truncation for fixed-width tabs."""
         filename = self.file_data['filename']
         # For 140px tab width with icon and close button, we have about 70px for text (roughly 9-10 chars)
@@ -349,13 +569,20 @@ class FilePreviewWidget(QWidget):
     def _load_image_icon(self):
         """Load and display a small 16x16 icon for image files."""
         try:
-            # Extract base64 data
-            data_url = self.file_data['data']
-            if data_url.startswith('data:image/'):
+            # Use the thumbnail made when the image was added
+            thumb_pixmap = self.file_data.get('_thumb_pixmap')
+            if thumb_pixmap is not None and not thumb_pixmap.isNull():
+                self.file_icon.setPixmap(thumb_pixmap)
+                return
+            
+            # Prefer the raw bytes kept alongside the data URL; decoding the URL means scanning the whole payload
+            image_bytes = self.file_data.get('_raw_bytes')
+            if image_bytes is None and self.file_data['data'].startswith('data:image/'):
                 # Split data URL: data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAA...
-                header, base64_data = data_url.split(',', 1)
-                image_bytes = base64.b64decode(base64_data)
-                
+                header, base64_data = self.file_data['data'].split(',', 1)
+                image_bytes = b64decode(base64_data)
+            
+            if image_bytes is not None:
                 # Create QPixmap from bytes
                 pixmap = QPixmap()
                 pixmap.loadFromData(image_bytes)
@@ -376,28 +603,16 @@ class FilePreviewWidget(QWidget):
                 self.file_icon.setText("🖼")
                 self.file_icon.setAlignment(Qt.AlignCenter)
         except Exception as e:
-            print(f"Error loading image icon: {e}")
+            logger.exception("Error loading image icon")
             self.file_icon.setText("🖼")
             self.file_icon.setAlignment(Qt.AlignCenter)
     
     def _load_text_file_icon(self):
         """Load and display appropriate icon for text files based on extension."""
         filename = self.file_data['filename']
-        file_ext = os.path.splitext(filename.lower())[1]
-        
-        # Icon mapping for different file types
-        icon_map = {
-            '.py': '🐍', '.pyw': '🐍', '.pyi': '🐍',
-            '.js': '🟨', '.jsx': '🟨', '.ts': '🔷', '.tsx': '🔷',
-            '.java': '☕', '.c': '🔧', '.cpp': '🔧', '.h': '🔧',
-            '.cs': '🔷', '.go': '🐹', '.rs': '🦀', '.swift': '🍎',
-            '.php': '🐘', '.rb': '💎', '.kt': '🎯', '.scala': '🔺',
-            '.html': '🌐', '.css': '🎨', '.xml': '📄', '.json': '📋',
-            '.md': '📝', '.txt': '📄', '.sql': '🗃️', '.sh': '⚡',
-            '.yaml': '⚙️', '.yml': '⚙️', '.toml': '⚙️', '.ini': '⚙️'
-        }
+        file_ext = os.path.splitext(filename)[1].lower()
         
-        icon = icon_map.get(file_ext, '📄')  # Default to document icon
+        icon = _FILE_ICON_MAP.get(file_ext, '📄')  # Default to document icon
         self.file_icon.setText(icon)
         self.file_icon.setAlignment(Qt.AlignCenter)
     
@@ -430,23 +645,192 @@ class TextFilePreviewWidget(FilePreviewWidget):
         super().__init__(text_file_data, "text", parent)
 
 
+# Longest side, in pixels, of images attached to the feedback
+MAX_IMAGE_DIMENSION = 1024
+
+# Attachment limits, checked before any file is opened
+MAX_IMAGES = 5
+MAX_TEXT_FILES = 5
+MAX_IMAGE_FILE_BYTES = 10 * 1024 * 1024
+MAX_TEXT_FILE_BYTES = 5 * 1024 * 1024
+
+
+def read_image_scaled(reader: QImageReader, max_size: int = MAX_IMAGE_DIMENSION) -> QImage:
+    """Decode an image, letting the codec downscale it while decoding if it is larger than max_size."""
+    size = reader.size()  # Read from the header, nothing is decoded yet
+    if size.isValid() and (size.width() > max_size or size.height() > max_size):
+        reader.setScaledSize(size.scaled(max_size, max_size, Qt.KeepAspectRatio))
+    return reader.read()
+
+
+# MIME type and data URL prefix for each image format produced by _compress_image
+_IMAGE_MIME_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png"}
+_DATA_URI_PREFIXES = {fmt: f"data:{mime};base64," for fmt, mime in _IMAGE_MIME_TYPES.items()}
+
+
+class ImageEncodeSignals(QObject):
+    finished = Signal(dict, float)  # (image_entry, compression_ratio)
+    failed = Signal(str)
+
+
+class ImageEncodeTask(QRunnable):
+    """Compress and base64-encode an image on a QThreadPool worker thread."""
+
+    # Image files larger than this are decoded by Qt straight from disk instead of being read into Python first
+    FULL_READ_LIMIT = 512 * 1024
+    # Enough of the file for the format, dimension and transparency checks
+    HEADER_PEEK_SIZE = 4096
+
+    def __init__(self, compress, name: str,
+                 image: Optional[QImage] = None, file_path: Optional[str] = None, file_size: int = 0):
+        super().__init__()
+        # Owned by the task rather than the widget, so emitting stays safe if the widget is deleted mid-encode
+        self.signals = ImageEncodeSignals()
+        self.compress = compress
+        self.name = name  # Filename without extension
+        self.image = image  # Clipboard image (QImage is safe to use off the GUI thread)
+        self.file_path = file_path  # Dropped/selected image file
+        self.file_size = file_size
+
+    def run(self):
+        try:
+            decoded_image = None
+            header_only = False
+            if self.file_path is not None:
+                with open(self.file_path, 'rb') as f:
+                    if self.file_size <= self.FULL_READ_LIMIT:
+                        original_data = f.read()
+                    else:
+                        original_data = f.read(self.HEADER_PEEK_SIZE)
+                        decoded_image = read_image_scaled(QImageReader(self.file_path))
+                        if decoded_image.isNull():
+                            # Let _compress_image deal with the full bytes
+                            original_data += f.read()
+                            decoded_image = None
+                        else:
+                            header_only = True
+                original_size = self.file_size
+            else:
+                buffer = QBuffer()
+                buffer.open(QIODevice.WriteOnly)
+                self.image.save(buffer, "PNG")
+                original_data = buffer.data().data()
+                del buffer  # Drop Qt's copy of the PNG
+                original_size = len(original_data)
+                # The clipboard image is already decoded, so don't decode the PNG again unless it may be kept as-is
+                if original_size >= FeedbackTextEdit.SKIP_RECOMPRESS_PNG_BYTES:
+                    decoded_image = self.image
+
+            compressed_data, image_format = self.compress(original_data, image=decoded_image)
+            if header_only and compressed_data is original_data:
+                # Compression fell back to the original, but only its header was read
+                with open(self.file_path, 'rb') as f:
+                    compressed_data = f.read()
+
+            # Kept in memory, never re-encoded
+            thumbnail = self._make_thumbnail(decoded_image if decoded_image is not None else self.image,
+                                             compressed_data)
+
+            # Only the compressed bytes are needed from here on; release the original before the base64 pass
+            del original_data, decoded_image
+            self.image = None
+
+            # Determine file extension based on format
+            file_ext = "jpg" if image_format == "JPEG" else "png"
+            image_entry = {
+                "filename": f"{self.name}.{file_ext}",
+                "data": b64encode_data_url(_DATA_URI_PREFIXES[image_format], compressed_data),
+                # Private fields for the preview widgets, stripped by export_images()
+                "_raw_bytes": compressed_data,
+                "_thumbnail": thumbnail,
+            }
+
+            # Calculate compression ratio
+            compressed_size = len(compressed_data)
+            compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
+
+            self.signals.finished.emit(image_entry, compression_ratio)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+    def _make_thumbnail(self, image: Optional[QImage], image_data: bytes) -> Optional[QImage]:
+        """Scale the image down to the 16x16 tab icon once, while it is still decoded."""
+        if image is None or image.isNull():
+            # Only small files reach this point without a decoded image
+            image = QImage.fromData(image_data)
+        if image.isNull():
+            return None
+        return image.scaled(16, 16, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+
+class TextFileReadSignals(QObject):
+    finished = Signal(dict)  # text_file_entry
+    failed = Signal(str)
+
+
+class TextFileReadTask(QRunnable):
+    """Detect the encoding of and read a large text file on a QThreadPool worker thread."""
+
+    def __init__(self, read, file_path: str, file_size: int):
+        super().__init__()
+        # Owned by the task, see ImageEncodeTask
+        self.signals = TextFileReadSignals()
+        self.read = read
+        self.file_path = file_path  # Already absolute
+        self.file_size = file_size
+
+    def run(self):
+        try:
+            content, encoding = self.read(self.file_path, self.file_size)
+            self.signals.finished.emit({
+                "filename": os.path.basename(self.file_path),
+                "content": content,
+                "path": self.file_path,
+                "size": self.file_size,
+                "encoding": encoding
+            })
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+
+
 
 
 class FeedbackTextEdit(QTextEdit):
+    # Text files larger than this are read on a worker thread
+    BACKGROUND_TEXT_READ_BYTES = 1024 * 1024
+    # Text files larger than this are decoded straight from a read-only memory map
+    MMAP_TEXT_READ_BYTES = 512 * 1024
+    # Images under these sizes (and within max_size) are attached as-is instead of being re-encoded
+    SKIP_RECOMPRESS_JPEG_BYTES = 500 * 1024
+    SKIP_RECOMPRESS_PNG_BYTES = 100 * 1024
+    # Encoding detection only ever looks at this many leading bytes, whatever the file size
+    ENCODING_SAMPLE_BYTES = 10 * 1024
+    ENCODING_FALLBACK_SAMPLE_BYTES = 1024
+
     def __init__(self, parent=None):
         super().__init__(parent)
         self.setAcceptDrops(True)
         # Enable input method support for Chinese and other non-Latin languages
         self.setAttribute(Qt.WA_InputMethodEnabled, True)
-        self.images = []  # Store image data as list of dicts
-        self.text_files = []  # Store text file data as list of dicts
+        # Store image / text file data dicts keyed by id(entry); dicts keep insertion order
+        self.images: dict[int, dict] = {}
+        self.text_files: dict[int, dict] = {}
+        # Images are compressed/encoded on a worker thread; count the ones still in flight
+        self._pending_images = 0
+        # Same for large text files
+        self._pending_text_files = 0
+
+    def _get_feedback_ui(self) -> Optional["FeedbackUI"]:
+        """Return the FeedbackUI window containing this widget."""
+        # window() finds the top-level widget in one call, so there's nothing to cache or invalidate
+        window = self.window()
+        return window if isinstance(window, FeedbackUI) else None
 
     def keyPressEvent(self, event: QKeyEvent):
-        if (event.key() == Qt.Key_Return and event.modifiers() == Qt.ControlModifier):
+        # Ctrl+Enter submits, from either Enter key and with other modifiers also held (e.g. Ctrl+Shift+Enter)
+        if event.key() in (Qt.Key_Return, Qt.Key_Enter) and event.modifiers() & Qt.ControlModifier:
             # Find the parent FeedbackUI instance and call submit
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
+            parent = self._get_feedback_ui()
             if parent:
                 parent._submit_feedback()
         else:
@@ -487,7 +871,7 @@ class FeedbackTextEdit(QTextEdit):
             for url in event.mimeData().urls():
                 if url.isLocalFile():
                     file_path = url.toLocalFile()
-                    if self._is_image_file(file_path) or self._is_text_file(file_path):
+                    if self._get_file_kind(file_path):
                         event.acceptProposedAction()
                         return
         super().dragEnterEvent(event)
@@ -498,128 +882,120 @@ class FeedbackTextEdit(QTextEdit):
             for url in event.mimeData().urls():
                 if url.isLocalFile():
                     file_path = url.toLocalFile()
-                    if self._is_image_file(file_path):
+                    file_kind = self._get_file_kind(file_path)
+                    if file_kind == "image":
                         self._handle_image_file(file_path)
                         event.acceptProposedAction()
                         return
-                    elif self._is_text_file(file_path):
+                    elif file_kind == "text":
                         self._handle_text_file(file_path)
                         event.acceptProposedAction()
                         return
         super().dropEvent(event)
 
+    def _get_file_kind(self, file_path: str) -> Optional[str]:
+        """Classify a file as "image", "text" or None (unsupported) from a single extension lookup."""
+        file_ext = os.path.splitext(file_path)[1].lower()
+        if file_ext in _image_extensions():
+            return "image"
+        if file_ext in _TEXT_EXTENSIONS or os.path.basename(file_path).lower() in _TEXT_BASENAMES:
+            return "text"
+        return None
+    
     def _is_image_file(self, file_path: str) -> bool:
         """Check if file is a supported image format."""
-        mime_type, _ = mimetypes.guess_type(file_path)
-        return mime_type and mime_type.startswith('image/')
+        return self._get_file_kind(file_path) == "image"
     
     def _is_text_file(self, file_path: str) -> bool:
         """Check if file is a supported text/code format."""
-        # Define supported text file extensions
-        text_extensions = {
-            # Programming languages
-            '.py', '.pyw', '.pyi',  # Python
-            '.js', '.jsx', '.ts', '.tsx', '.mjs', '.cjs',  # JavaScript/TypeScript
-            '.java',  # Java
-            '.c', '.cpp', '.cxx', '.cc', '.h', '.hpp', '.hxx',  # C/C++
-            '.cs', '.csx',  # C#
-            '.go',  # Go
-            '.rs',  # Rust
-            '.swift',  # Swift
-            '.kt', '.kts',  # Kotlin
-            '.scala', '.sc',  # Scala
-            '.rb', '.rbw',  # Ruby
-            '.php', '.phtml',  # PHP
-            '.pl', '.pm',  # Perl
-            '.r', '.R',  # R
-            '.m',  # MATLAB/Objective-C
-            '.lua',  # Lua
-            '.dart',  # Dart
-            '.mm',  # Objective-C++
-            
-            # Web development
-            '.html', '.htm', '.xhtml',  # HTML
-            '.css', '.scss', '.sass', '.less', '.styl',  # CSS
-            '.xml', '.xsl', '.xsd',  # XML
-            '.json', '.jsonc',  # JSON
-            '.yaml', '.yml',  # YAML
-            '.toml',  # TOML
-            
-            # Scripts and config
-            '.sh', '.bash', '.zsh', '.fish',  # Shell scripts
-            '.ps1',  # PowerShell
-            '.bat', '.cmd',  # Windows batch
-            '.sql',  # SQL
-            '.graphql', '.gql',  # GraphQL
-            
-            # Documents
-            '.md', '.markdown', '.mdown', '.mdx',  # Markdown
-            '.rst',  # reStructuredText
-            '.tex', '.cls', '.sty',  # LaTeX
-            '.txt', '.text',  # Plain text
-            '.log',  # Log files
-            
-            # Config files
-            '.ini', '.cfg', '.conf',  # INI/Config
-            '.properties',  # Properties
-            '.env', '.environment',  # Environment
-        }
-        
-        file_ext = os.path.splitext(file_path.lower())[1]
-        return file_ext in text_extensions or os.path.basename(file_path.lower()) in ['makefile', 'dockerfile']
+        return self._get_file_kind(file_path) == "text"
     
-    def _detect_encoding(self, file_path: str) -> str:
-        """Detect file encoding."""
+    def _detect_encoding_from_bytes(self, raw_data: bytes) -> str:
+        """Detect the encoding of already-read leading file bytes."""
+        # Fast path: byte order marks
+        if raw_data.startswith(b'\xef\xbb\xbf'):
+            return 'utf-8-sig'
+        if raw_data.startswith((b'\xff\xfe', b'\xfe\xff')):
+            return 'utf-16'
+        
+        # Fast path: valid UTF-8 (non-final decode tolerates a character cut off by the sample)
+        try:
+            codecs.getincrementaldecoder('utf-8')().decode(raw_data)
+            return 'utf-8'
+        except UnicodeDecodeError:
+            pass
+        
         try:
-            import chardet
-            with open(file_path, 'rb') as f:
-                raw_data = f.read(10240)  # Read first 10KB for detection
-                result = chardet.detect(raw_data)
-                return result['encoding'] or 'utf-8'
+            import charset_normalizer
+            best = charset_normalizer.from_bytes(raw_data).best()
+            if best is not None:
+                return best.encoding
         except ImportError:
-            # Fallback without chardet
-            encodings = ['utf-8', 'gbk', 'gb2312', 'latin1']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        f.read(1024)  # Try to read first 1KB
-                        return encoding
-                except (UnicodeDecodeError, UnicodeError):
-                    continue
-            return 'utf-8'  # Final fallback
+            pass
         except Exception:
             return 'utf-8'
+        
+        # Fallback without charset_normalizer
+        encodings = ['gbk', 'gb2312', 'latin1']
+        for encoding in encodings:
+            try:
+                codecs.getincrementaldecoder(encoding)().decode(raw_data[:self.ENCODING_FALLBACK_SAMPLE_BYTES])
+                return encoding
+            except (UnicodeDecodeError, UnicodeError):
+                continue
+        return 'utf-8'  # Final fallback
     
-    def _compress_image(self, image_data: bytes, max_size: int = 1024, quality: int = 75) -> tuple[bytes, str]:
+    def _compress_image(self, image_data: bytes, max_size: int = MAX_IMAGE_DIMENSION, quality: int = 75,
+                        image: Optional[QImage] = None) -> tuple[bytes, str]:
         """
         Compress image to reduce file size while maintaining reasonable quality.
         
         Args:
-            image_data: Original image bytes
+            image_data: Original image bytes (only the leading header bytes when image is given)
             max_size: Maximum width/height in pixels
             quality: JPEG quality (1-100, lower = smaller file)
+            image: Already decoded image; skips decoding image_data and the small-image fast path
             
         Returns:
             Tuple of (compressed_bytes, format)
         """
         try:
-            from PySide6.QtGui import QPixmap
-            from PySide6.QtCore import QBuffer, QIODevice
+            # Fast path: small JPEG/PNG that already fits, skip the decode/encode round-trip
+            keep_original_png = False
+            if image is None:
+                if image_data.startswith(b'\xff\xd8\xff') and len(image_data) < self.SKIP_RECOMPRESS_JPEG_BYTES:
+                    dimensions = self._peek_jpeg_dimensions(image_data)
+                    if dimensions and max(dimensions) <= max_size:
+                        return image_data, "JPEG"
+                elif image_data.startswith(b'\x89PNG\r\n\x1a\n') and len(image_data) < self.SKIP_RECOMPRESS_PNG_BYTES:
+                    dimensions = self._peek_png_dimensions(image_data)
+                    # Only a PNG whose header allows transparency can stay PNG; its pixels decide below
+                    keep_original_png = (bool(dimensions) and max(dimensions) <= max_size
+                                         and self._has_transparency(image_data))
             
-            # Load image from bytes
-            pixmap = QPixmap()
-            pixmap.loadFromData(image_data)
+            # Load image from bytes (QImage rather than QPixmap so this can run off the GUI thread);
+            # oversized images are scaled down while decoding instead of being fully decoded first
+            if image is None:
+                buffer = QBuffer()
+                buffer.setData(QByteArray(image_data))
+                buffer.open(QIODevice.ReadOnly)
+                image = read_image_scaled(QImageReader(buffer), max_size)
             
-            if pixmap.isNull():
+            if image.isNull():
                 return image_data, "PNG"  # Return original if can't process
             
+            # Decide on the decoded pixels, whether the caller or this method decoded them
+            has_transparency = self._has_transparency(image_data, image)
+            if keep_original_png and has_transparency:
+                return image_data, "PNG"
+            
             # Calculate new size while maintaining aspect ratio
-            original_width = pixmap.width()
-            original_height = pixmap.height()
+            original_width = image.width()
+            original_height = image.height()
             
             if original_width <= max_size and original_height <= max_size:
                 # Image is already small enough, but still compress for quality
-                new_pixmap = pixmap
+                new_image = image
             else:
                 # Scale down image
                 if original_width > original_height:
@@ -629,7 +1005,7 @@ class FeedbackTextEdit(QTextEdit):
                     new_height = max_size
                     new_width = int(original_width * max_size / original_height)
                 
-                new_pixmap = pixmap.scaled(
+                new_image = image.scaled(
                     new_width, new_height,
                     Qt.KeepAspectRatio,
                     Qt.SmoothTransformation
@@ -640,245 +1016,281 @@ class FeedbackTextEdit(QTextEdit):
             buffer.open(QIODevice.WriteOnly)
             
             # Determine output format
-            if self._has_transparency(image_data):
+            if has_transparency:
                 # Keep PNG for images with transparency
-                new_pixmap.save(buffer, "PNG")
+                new_image.save(buffer, "PNG")
                 return buffer.data().data(), "PNG"
             else:
                 # Use JPEG for better compression
-                new_pixmap.save(buffer, "JPEG", quality)
+                new_image.save(buffer, "JPEG", quality)
                 return buffer.data().data(), "JPEG"
                 
         except Exception as e:
-            print(f"Error compressing image: {e}")
+            logger.exception("Error compressing image")
             return image_data, "PNG"  # Return original if compression fails
     
-    def _has_transparency(self, image_data: bytes) -> bool:
+    def _peek_jpeg_dimensions(self, image_data: bytes) -> Optional[tuple[int, int]]:
+        """Read (width, height) from the JPEG SOF marker without decoding the image."""
+        offset = 2  # Skip SOI
+        length = len(image_data)
+        while offset + 4 <= length:
+            if image_data[offset] != 0xFF:
+                return None
+            marker = image_data[offset + 1]
+            if marker == 0xFF:  # Fill byte
+                offset += 1
+                continue
+            if marker == 0x01 or 0xD0 <= marker <= 0xD8:  # Markers without a length field
+                offset += 2
+                continue
+            segment_length = int.from_bytes(image_data[offset + 2:offset + 4], 'big')
+            # SOF0-SOF15, excluding DHT (C4), JPG (C8) and DAC (CC)
+            if 0xC0 <= marker <= 0xCF and marker not in (0xC4, 0xC8, 0xCC):
+                if offset + 9 > length:
+                    return None
+                height = int.from_bytes(image_data[offset + 5:offset + 7], 'big')
+                width = int.from_bytes(image_data[offset + 7:offset + 9], 'big')
+                return width, height
+            offset += 2 + segment_length
+        return None
+
+    def _peek_png_dimensions(self, image_data: bytes) -> Optional[tuple[int, int]]:
+        """Read (width, height) from the PNG IHDR chunk without decoding the image."""
+        if len(image_data) < 24 or image_data[12:16] != b'IHDR':
+            return None
+        width = int.from_bytes(image_data[16:20], 'big')
+        height = int.from_bytes(image_data[20:24], 'big')
+        return width, height
+
+    def _has_transparency(self, image_data: bytes, image: Optional[QImage] = None) -> bool:
         """Check if image has transparency (alpha channel)."""
         try:
-            # Check PNG signature and look for transparency
-            if image_data.startswith(b'\x89PNG\r\n\x1a\n'):
-                # Simple check for PNG transparency - look for tRNS chunk or RGBA color type
-                return b'tRNS' in image_data[:1000] or b'RGBA' in image_data[:100]
+            if image is not None:
+                # An alpha channel can still be fully opaque, so look at the pixels
+                if not image.hasAlphaChannel():
+                    return False
+                alpha = image.convertToFormat(QImage.Format.Format_Alpha8)
+                width, stride = alpha.width(), alpha.bytesPerLine()
+                data = bytes(alpha.constBits())
+                if stride != width:
+                    # Leave out the row padding
+                    data = b"".join(data[row:row + width] for row in range(0, len(data), stride))
+                return data.count(255) != len(data)
+            
+            # Without decoded pixels only a PNG header is checked; IHDR is always the first chunk and
+            # holds the color type at byte 25
+            if not image_data.startswith(b'\x89PNG\r\n\x1a\n') or len(image_data) <= 25:
+                return False
+            if image_data[25] in (4, 6):  # Grayscale + alpha, RGB + alpha
+                return True
+            
+            # Otherwise transparency comes from a tRNS chunk, which must precede IDAT
+            offset = 8
+            while offset + 8 <= len(image_data):
+                chunk_length = int.from_bytes(image_data[offset:offset + 4], 'big')
+                chunk_type = image_data[offset + 4:offset + 8]
+                if chunk_type == b'tRNS':
+                    return True
+                if chunk_type in (b'IDAT', b'IEND'):
+                    return False
+                offset += 12 + chunk_length  # length + type + data + CRC
             return False
         except:
             return False
 
-    def _handle_image_paste(self, image: QPixmap):
+    def _handle_image_paste(self, image: QImage):
         """Handle image pasted from clipboard."""
         try:
-            # Check image limit (maximum 5 images)
-            if len(self.images) >= 5:
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            # Check image limit
+            if len(self.images) + self._pending_images >= MAX_IMAGES:
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("max_images_reached")
                 return
             
-            # Convert QPixmap to bytes first
-            from PySide6.QtCore import QBuffer, QIODevice
-            from PySide6.QtGui import QPixmap
-            
-            buffer = QBuffer()
-            buffer.open(QIODevice.WriteOnly)
-            image.save(buffer, "PNG")
-            original_data = buffer.data().data()
-            
-            # Compress the image
-            compressed_data, image_format = self._compress_image(original_data)
-            base64_data = base64.b64encode(compressed_data).decode('utf-8')
+            # QPixmap is tied to the GUI thread, so hand the worker a QImage
+            if isinstance(image, QPixmap):
+                image = image.toImage()
             
-            # Determine file extension based on format
-            file_ext = "jpg" if image_format == "JPEG" else "png"
-            
-            # Create image entry
-            image_entry = {
-                "filename": f"clipboard_image_{len(self.images) + 1}.{file_ext}",
-                "data": f"data:image/{image_format.lower()};base64,{base64_data}"
-            }
-            
-            self.images.append(image_entry)
-            
-            # Insert placeholder text with proper formatting
-            placeholder = f"[图片: {image_entry['filename']}]"
-            cursor = self.textCursor()
-            # If not at the beginning of a line, add a newline before
-            if cursor.positionInBlock() > 0:
-                self.insertPlainText("\n")
-            self.insertPlainText(placeholder)
-            # Add a newline after the placeholder
-            self.insertPlainText("\n")
-            
-            # Get parent FeedbackUI to show notification and update previews
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
-            if parent:
-                # Calculate compression ratio
-                original_size = len(original_data)
-                compressed_size = len(compressed_data)
-                compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
-                
-                parent._show_image_notification(image_entry['filename'], compression_ratio)
-                parent._update_file_previews()
+            name = f"clipboard_image_{len(self.images) + self._pending_images + 1}"
+            self._start_image_encode(ImageEncodeTask(self._compress_image, name, image=image))
                 
         except Exception as e:
-            print(f"Error handling image paste: {e}")
+            logger.exception("Error handling image paste")
 
     def _handle_image_file(self, file_path: str):
         """Handle image file dropped or selected."""
         try:
-            # Check image limit (maximum 5 images)
-            if len(self.images) >= 5:
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            # Check image limit
+            if len(self.images) + self._pending_images >= MAX_IMAGES:
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("max_images_reached")
                 return
             
-            # Check file size (10MB limit)
-            file_size = os.path.getsize(file_path)
-            if file_size > 10 * 1024 * 1024:  # 10MB
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            # Check file size
+            file_size = os.stat(file_path).st_size
+            if file_size > MAX_IMAGE_FILE_BYTES:
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("image_too_large")
                 return
             
-            # Read and compress image
-            with open(file_path, 'rb') as f:
-                original_data = f.read()
-            
-            # Determine MIME type
-            mime_type, _ = mimetypes.guess_type(file_path)
-            if not mime_type or not mime_type.startswith('image/'):
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            if not self._is_image_file(file_path):
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("invalid_image_format")
                 return
             
-            # Compress the image
-            compressed_data, image_format = self._compress_image(original_data)
-            base64_data = base64.b64encode(compressed_data).decode('utf-8')
-            
-            # Update filename extension if format changed
+            # Read, compress and encode on a worker thread; the extension is updated if the format changes
             original_filename = os.path.basename(file_path)
-            name_without_ext = os.path.splitext(original_filename)[0]
-            file_ext = "jpg" if image_format == "JPEG" else "png"
-            final_filename = f"{name_without_ext}.{file_ext}"
-            
-            # Create image entry
-            image_entry = {
-                "filename": final_filename,
-                "data": f"data:image/{image_format.lower()};base64,{base64_data}"
-            }
-            
-            self.images.append(image_entry)
-            
-            # Insert placeholder text with proper formatting
-            placeholder = f"[图片: {final_filename}]"
-            cursor = self.textCursor()
-            # If not at the beginning of a line, add a newline before
-            if cursor.positionInBlock() > 0:
-                self.insertPlainText("\n")
-            self.insertPlainText(placeholder)
-            # Add a newline after the placeholder
-            self.insertPlainText("\n")
-            
-            # Get parent FeedbackUI to show notification and update previews
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
-            if parent:
-                # Calculate compression ratio
-                original_size = len(original_data)
-                compressed_size = len(compressed_data)
-                compression_ratio = (1 - compressed_size / original_size) * 100 if original_size > 0 else 0
-                
-                parent._show_image_notification(final_filename, compression_ratio)
-                parent._update_file_previews()
+            name_without_ext = original_filename.rpartition('.')[0] or original_filename
+            self._start_image_encode(ImageEncodeTask(self._compress_image, name_without_ext,
+                                                    file_path=file_path, file_size=file_size))
                 
         except Exception as e:
-            print(f"Error handling image file: {e}")
+            logger.exception("Error handling image file")
+
+    def _start_image_encode(self, task: ImageEncodeTask):
+        """Dispatch an image compress/encode task to the global thread pool."""
+        self._pending_images += 1
+        # Connections to this widget are dropped if it is deleted first, so late results are discarded
+        task.signals.finished.connect(self._on_image_encoded, Qt.QueuedConnection)
+        task.signals.failed.connect(self._on_image_encode_failed, Qt.QueuedConnection)
+        QThreadPool.globalInstance().start(task)
+
+    def _on_image_encoded(self, image_entry: dict, compression_ratio: float):
+        """Add an image once the worker has compressed and encoded it."""
+        self._pending_images -= 1
+        # QPixmap may only be created on the GUI thread
+        thumbnail = image_entry.pop("_thumbnail", None)
+        image_entry["_thumb_pixmap"] = QPixmap.fromImage(thumbnail) if thumbnail is not None else None
+        self.images[id(image_entry)] = image_entry
+        
+        # Insert placeholder text with proper formatting
+        self._insert_placeholder(f"[图片: {image_entry['filename']}]")
+        
+        # Get parent FeedbackUI to show notification and update previews
+        parent = self._get_feedback_ui()
+        if parent:
+            parent._show_image_notification(image_entry['filename'], compression_ratio)
+            parent._schedule_preview_update()
+
+    def _on_image_encode_failed(self, error: str):
+        """Handle an image the worker could not read or encode."""
+        self._pending_images -= 1
+        logger.error("Error encoding image: %s", error)
 
     def _handle_text_file(self, file_path: str):
         """Handle text file dropped or selected."""
         try:
-            # Check text file limit (maximum 5 text files)
-            if len(self.text_files) >= 5:
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            # Check text file limit
+            if len(self.text_files) + self._pending_text_files >= MAX_TEXT_FILES:
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("max_text_files_reached")
                 return
             
-            # Check file size (5MB limit for text files)
-            file_size = os.path.getsize(file_path)
-            if file_size > 5 * 1024 * 1024:  # 5MB
-                parent = self.parent()
-                while parent and not isinstance(parent, FeedbackUI):
-                    parent = parent.parent()
+            # Check file size
+            file_size = os.stat(file_path).st_size
+            if file_size > MAX_TEXT_FILE_BYTES:
+                parent = self._get_feedback_ui()
                 if parent:
                     parent._show_error_message("text_file_too_large")
                 return
             
-            # Detect encoding and read file content
-            encoding = self._detect_encoding(file_path)
-            try:
-                with open(file_path, 'r', encoding=encoding) as f:
-                    content = f.read()
-            except UnicodeDecodeError:
-                # Fallback to utf-8 with error handling
-                with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-                    content = f.read()
-                encoding = 'utf-8'
+            # Resolve the path once; the filename and the worker both reuse it
+            abs_path = os.path.abspath(file_path)
+            
+            # Large files are read and decoded on a worker thread
+            if file_size > self.BACKGROUND_TEXT_READ_BYTES:
+                self._pending_text_files += 1
+                task = TextFileReadTask(self._read_text_file, abs_path, file_size)
+                task.signals.finished.connect(self._on_text_file_read, Qt.QueuedConnection)
+                task.signals.failed.connect(self._on_text_file_read_failed, Qt.QueuedConnection)
+                QThreadPool.globalInstance().start(task)
+                return
+            
+            content, encoding = self._read_text_file(abs_path, file_size)
             
             # Create text file entry
-            filename = os.path.basename(file_path)
+            filename = os.path.basename(abs_path)
             text_file_entry = {
                 "filename": filename,
                 "content": content,
-                "path": os.path.abspath(file_path),
+                "path": abs_path,
                 "size": file_size,
                 "encoding": encoding
             }
-            
-            self.text_files.append(text_file_entry)
-            
-            # Insert placeholder text with proper formatting
-            placeholder = f"[代码文件: {filename}]"
-            cursor = self.textCursor()
-            # If not at the beginning of a line, add a newline before
-            if cursor.positionInBlock() > 0:
-                self.insertPlainText("\n")
-            self.insertPlainText(placeholder)
-            # Add a newline after the placeholder
-            self.insertPlainText("\n")
-            
-            # Get parent FeedbackUI to show notification and update previews
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
-            if parent:
-                parent._show_text_file_notification(filename, file_size)
-                parent._update_file_previews()
+            self._add_text_file(text_file_entry)
                 
         except Exception as e:
-            print(f"Error handling text file: {e}")
-
-    def get_images(self) -> list[dict]:
-        """Get all images as list of dicts."""
-        return self.images.copy()
-
-    def get_text_files(self) -> list[dict]:
-        """Get all text files as list of dicts."""
-        return self.text_files.copy()
+            logger.exception("Error handling text file")
+
+    def _read_text_file(self, file_path: str, file_size: int) -> tuple[str, str]:
+        """Detect encoding and read file content; returns (content, encoding)."""
+        # Read the file once and decode in memory, so a misdetected encoding doesn't cost a second read
+        with open(file_path, 'rb') as f:
+            if file_size > self.MMAP_TEXT_READ_BYTES:
+                # Decode from the page cache without first copying the whole file onto the heap
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as raw_data:
+                    return self._decode_text(raw_data)
+            return self._decode_text(f.read())
+    
+    def _decode_text(self, raw_data) -> tuple[str, str]:
+        """Decode raw file bytes (or a buffer such as an mmap); returns (content, encoding)."""
+        encoding = self._detect_encoding_from_bytes(raw_data[:self.ENCODING_SAMPLE_BYTES])
+        try:
+            content = str(raw_data, encoding)
+        except (UnicodeDecodeError, LookupError):
+            # Fallback to utf-8 with error handling
+            content = str(raw_data, 'utf-8', errors='replace')
+            encoding = 'utf-8'
+        # Match text-mode reads, which translate \r\n and \r to \n
+        if '\r' in content:
+            content = content.replace('\r\n', '\n').replace('\r', '\n')
+        return content, encoding
+
+    def _add_text_file(self, text_file_entry: dict):
+        """Add a text file entry and its placeholder."""
+        self.text_files[id(text_file_entry)] = text_file_entry
+        
+        # Insert placeholder text with proper formatting
+        self._insert_placeholder(f"[代码文件: {text_file_entry['filename']}]")
+        
+        # Get parent FeedbackUI to show notification and update previews
+        parent = self._get_feedback_ui()
+        if parent:
+            parent._show_text_file_notification(text_file_entry['filename'], text_file_entry['size'])
+            parent._schedule_preview_update()
+
+    def _on_text_file_read(self, text_file_entry: dict):
+        """Add a text file once the worker has read it."""
+        self._pending_text_files -= 1
+        self._add_text_file(text_file_entry)
+
+    def _on_text_file_read_failed(self, error: str):
+        """Handle a text file the worker could not read."""
+        self._pending_text_files -= 1
+        logger.error("Error handling text file: %s", error)
+
+    def wait_for_pending_files(self):
+        """Block until in-flight image encodes and text file reads finish and their results are added."""
+        if self._pending_images or self._pending_text_files:
+            QThreadPool.globalInstance().waitForDone()
+            QCoreApplication.sendPostedEvents(self, QEvent.MetaCall)
+
+    def get_images(self) -> tuple[dict, ...]:
+        """Get all images as a read-only tuple of dicts; don't hold on to it past the current update."""
+        return tuple(self.images.values())
+
+    def export_images(self) -> list[dict]:
+        """Get all images as {"filename", "data"} dicts, without the private preview fields."""
+        return [{"filename": image["filename"], "data": image["data"]} for image in self.images.values()]
+
+    def get_text_files(self) -> tuple[dict, ...]:
+        """Get all text files as a read-only tuple of dicts; don't hold on to it past the current update."""
+        return tuple(self.text_files.values())
 
     def clear_images(self):
         """Clear all images."""
@@ -888,53 +1300,87 @@ class FeedbackTextEdit(QTextEdit):
         """Clear all text files."""
         self.text_files.clear()
     
+    def _insert_placeholder(self, placeholder: str):
+        """Insert a placeholder on its own line as a single edit (one layout pass, one undo step)."""
+        cursor = self.textCursor()
+        cursor.beginEditBlock()
+        try:
+            # If not at the beginning of a line, add a newline before
+            if cursor.positionInBlock() > 0:
+                cursor.insertText("\n")
+            cursor.insertText(placeholder + "\n")
+        finally:
+            cursor.endEditBlock()
+        self.setTextCursor(cursor)
+    
+    def _remove_placeholder(self, placeholder: str):
+        """Delete a placeholder in place, keeping the rest of the document and its undo history."""
+        cursor = self.document().find(placeholder)
+        if cursor.isNull():
+            return
+        block = cursor.block()
+        cursor.beginEditBlock()
+        if block.text().strip() == placeholder:
+            # The placeholder sits on its own line: drop the whole block with one separator
+            next_block = block.next()
+            previous_block = block.previous()
+            if next_block.isValid():
+                cursor.setPosition(block.position())
+                cursor.setPosition(next_block.position(), QTextCursor.KeepAnchor)
+            elif previous_block.isValid():
+                cursor.setPosition(previous_block.position() + previous_block.length() - 1)
+                cursor.setPosition(block.position() + block.length() - 1, QTextCursor.KeepAnchor)
+            else:
+                cursor.select(QTextCursor.BlockUnderCursor)
+        cursor.removeSelectedText()
+        cursor.endEditBlock()
+    
     def _remove_image(self, image_data: dict):
         """Remove a specific image from the list."""
-        if image_data in self.images:
-            self.images.remove(image_data)
-            
+        if self.images.pop(id(image_data), None) is not None:
             # Remove placeholder text from the text edit
-            text = self.toPlainText()
-            placeholder = f"[图片: {image_data['filename']}]"
-            # Remove the placeholder and clean up extra whitespace
-            updated_text = text.replace(placeholder, "")
-            # Clean up multiple consecutive newlines
-            updated_text = re.sub(r'\n\s*\n\s*\n', '\n\n', updated_text)
-            updated_text = updated_text.strip()
-            self.setPlainText(updated_text)
+            self._remove_placeholder(f"[图片: {image_data['filename']}]")
             
             # Notify parent to update preview
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
+            parent = self._get_feedback_ui()
             if parent:
-                parent._update_file_previews()
+                parent._schedule_preview_update()
     
     def _remove_text_file(self, text_file_data: dict):
         """Remove a specific text file from the list."""
-        if text_file_data in self.text_files:
-            self.text_files.remove(text_file_data)
-            
+        if self.text_files.pop(id(text_file_data), None) is not None:
             # Remove placeholder text from the text edit
-            text = self.toPlainText()
-            placeholder = f"[代码文件: {text_file_data['filename']}]"
-            # Remove the placeholder and clean up extra whitespace
-            updated_text = text.replace(placeholder, "")
-            # Clean up multiple consecutive newlines
-            updated_text = re.sub(r'\n\s*\n\s*\n', '\n\n', updated_text)
-            updated_text = updated_text.strip()
-            self.setPlainText(updated_text)
+            self._remove_placeholder(f"[代码文件: {text_file_data['filename']}]")
             
             # Notify parent to update preview
-            parent = self.parent()
-            while parent and not isinstance(parent, FeedbackUI):
-                parent = parent.parent()
+            parent = self._get_feedback_ui()
             if parent:
-                parent._update_file_previews()
+                parent._schedule_preview_update()
+
+
+class _LogLineDecoder:
+    """Incrementally decodes command output into whole lines, translating newlines like a text-mode pipe would."""
+
+    def __init__(self):
+        self._decoder = io.IncrementalNewlineDecoder(
+            codecs.getincrementaldecoder("utf-8")(errors="ignore"), translate=True)
+        self._partial_line = ""
+
+    def feed(self, chunk: bytes) -> str:
+        """Return the complete lines decoded so far, keeping a trailing partial line for the next chunk."""
+        lines, newline, self._partial_line = (self._partial_line + self._decoder.decode(chunk)).rpartition("\n")
+        return lines + newline
+
+    def finish(self) -> str:
+        """Return whatever is left once the pipe is done."""
+        rest = self._partial_line + self._decoder.decode(b"", final=True)
+        self._partial_line = ""
+        return rest
 
 
 class LogSignals(QObject):
     append_log = Signal(str)
+    process_finished = Signal(object, int)  # process, exit_code
 
 
 class FeedbackUI(QMainWindow):
@@ -945,6 +1391,17 @@ class FeedbackUI(QMainWindow):
     }
     # Minimum window size (width, height)
     MINIMUM_WINDOW_SIZE = (500, 500)
+    # Command output kept for the submitted logs and shown in the console, in lines
+    LOG_BUFFER_MAX_LINES = 10000
+    LOG_VIEW_MAX_LINES = 5000
+    # Command output is read from the pipes in chunks of up to this many bytes
+    LOG_READ_CHUNK_SIZE = 65536
+    # Console output is batched and written at most this often
+    LOG_FLUSH_INTERVAL_MS = 50
+    # Fallback system theme polling in auto mode, for platforms where Qt can't report the color scheme
+    THEME_POLL_INTERVAL_MS = 10000
+    # How long a subprocess/registry theme lookup is reused
+    SYSTEM_THEME_CACHE_SECONDS = 5.0
 
     def __init__(self, project_directory: str, prompt: str):
         super().__init__()
@@ -952,44 +1409,22 @@ class FeedbackUI(QMainWindow):
         self.prompt = prompt
 
         self.process: Optional[subprocess.Popen] = None
-        self.log_buffer = []
+        self.log_buffer: collections.deque[str] = collections.deque(maxlen=self.LOG_BUFFER_MAX_LINES)
+        self._pending_log: list[str] = []  # Lines waiting for the next console flush
+        # (fd, notifier, decoder) for each pipe of the running command watched from the event loop
+        self._pipe_watchers: list[tuple[io.BufferedReader, QSocketNotifier, _LogLineDecoder]] = []
         self.feedback_result = None
         self.log_signals = LogSignals()
-        self.log_signals.append_log.connect(self._append_log)
+        # Emitted from the reader/exit threads, delivered on the GUI thread
+        self.log_signals.append_log.connect(self._append_log, Qt.QueuedConnection)
+        self.log_signals.process_finished.connect(self._on_process_finished, Qt.QueuedConnection)
 
         # Initialize bilingual text manager
         self.text_manager = get_text_manager()
 
         self.setWindowTitle(self.text_manager.get_text('window_titles', 'interactive_feedback'))
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        icon_path = os.path.join(script_dir, "images", "feedback.png")
-        
-        # 设置窗口图标，添加存在性检查和调试信息
-        print(f"Debug: Looking for icon at: {icon_path}")
-        if os.path.exists(icon_path):
-            print(f"Debug: Icon file exists")
-            icon = QIcon(icon_path)
-            if not icon.isNull():
-                self.setWindowIcon(icon)
-                # 在macOS上设置应用程序图标到Dock
-                app = QApplication.instance()
-                if app:
-                    app.setWindowIcon(icon)
-                    if sys.platform == "darwin":
-                        # macOS上设置应用程序图标
-                        app.setApplicationDisplayName("Interactive Feedback")
-                print(f"Debug: Icon loaded successfully and set for application")
-            else:
-                print(f"Warning: Icon file exists but failed to load: {icon_path}")
-        else:
-            print(f"Warning: Icon file not found: {icon_path}")
-            # 列出当前目录内容以便调试
-            script_dir = os.path.dirname(os.path.abspath(__file__))
-            images_dir = os.path.join(script_dir, "images")
-            if os.path.exists(images_dir):
-                print(f"Debug: Images directory contents: {os.listdir(images_dir)}")
-            else:
-                print(f"Debug: Images directory not found: {images_dir}")
+        # 设置窗口图标（在事件循环启动后）
+        QTimer.singleShot(0, self._install_icon)
         # 设置窗口标志：根据保存的置顶状态设置
         # 在macOS上，需要使用不同的方法
         if sys.platform == "darwin":  # macOS
@@ -997,7 +1432,7 @@ class FeedbackUI(QMainWindow):
             # 不使用WindowStaysOnTopHint，而是在显示后设置置顶
             flags = Qt.Window | Qt.WindowTitleHint | Qt.WindowSystemMenuHint | Qt.WindowMinMaxButtonsHint | Qt.WindowCloseButtonHint
             self.setWindowFlags(flags)
-            print(f"Debug: macOS window flags set without StaysOnTop")
+            logger.debug("macOS window flags set without StaysOnTop")
         else:
             # Windows和Linux上根据保存的置顶状态设置标志
             flags = Qt.Window | Qt.WindowMinMaxButtonsHint | Qt.WindowCloseButtonHint
@@ -1006,10 +1441,21 @@ class FeedbackUI(QMainWindow):
             self.setWindowFlags(flags)
             # Window flags set based on stay_on_top preference
         
-        # Create notification banner (initially hidden)
-        self.notification_banner = None
+        # Create notification banner (initially hidden), reused for every message
+        self.notification_banner = QLabel(self)
+        self.notification_banner.setAlignment(Qt.AlignCenter)
+        self.notification_banner.setWordWrap(True)
+        # Apply CSS class for styling
+        self.notification_banner.setProperty("class", "notification-banner")
+        self.notification_banner.hide()
+        # Restarted by each message, so an earlier message's timeout can't hide a newer one
+        self._banner_timer = QTimer(self)
+        self._banner_timer.setSingleShot(True)
+        self._banner_timer.timeout.connect(self.hide_notification_banner)
         
         self.settings = QSettings("InteractiveFeedbackMCP", "InteractiveFeedbackMCP")
+        # Everything is stored per user; skip the system-wide/organization fallback lookups on every read
+        self.settings.setFallbacksEnabled(False)
         
         # Load general UI settings for the main window (geometry, state)
         self.settings.beginGroup("MainWindow_General")
@@ -1027,6 +1473,9 @@ class FeedbackUI(QMainWindow):
         state = self.settings.value("windowState")
         if state:
             self.restoreState(state)
+        # Remember what is stored, so closing without moving/resizing the window doesn't rewrite it
+        self._saved_geometry = bytes(geometry) if geometry else b""
+        self._saved_window_state = bytes(state) if state else b""
         self.settings.endGroup()  # End "MainWindow_General" group
         
         # Load project-specific settings (command, auto-execute, command section visibility)
@@ -1044,7 +1493,9 @@ class FeedbackUI(QMainWindow):
 
         # Theme management
         self.theme_mode = self.settings.value("theme/mode", "auto", type=str)  # "auto", "dark", "light"
+        self._system_theme_cache: Optional[tuple[float, bool]] = None  # (monotonic time, is_dark)
         self.is_dark_theme = self._get_effective_theme()
+        self._applied_dark_theme: Optional[bool] = None  # Theme whose palette/stylesheet is currently set
         
         # Stay on top management
         self.stay_on_top = self.settings.value("stay_on_top", False, type=bool)
@@ -1055,7 +1506,8 @@ class FeedbackUI(QMainWindow):
         # File management
         self.images = []
         self.text_files = []
-        self.file_preview_widgets = []
+        self.file_preview_widgets: dict[int, QWidget] = {}  # Preview widgets keyed by id(file entry)
+        self._preview_update_pending = False
 
         self._create_ui()  # self.config is used here to set initial values
 
@@ -1066,11 +1518,12 @@ class FeedbackUI(QMainWindow):
         else:
             self.toggle_command_button.setText(self.text_manager.get_text('buttons', 'command_section'))
 
-        # Start theme monitoring timer for auto mode
+        # Follow system color scheme changes as Qt reports them
+        QApplication.styleHints().colorSchemeChanged.connect(self._check_system_theme_change)
+        # Theme polling timer, the fallback for auto mode where Qt can't report the color scheme
         self.theme_timer = QTimer()
         self.theme_timer.timeout.connect(self._check_system_theme_change)
-        if self.theme_mode == "auto":
-            self.theme_timer.start(3000)  # Check every 3 seconds only in auto mode
+        self._start_theme_polling()
 
         set_dark_title_bar(self, True)
         
@@ -1117,8 +1570,9 @@ class FeedbackUI(QMainWindow):
         self.setWindowTitle(self.text_manager.get_text('window_titles', 'interactive_feedback'))
         self.setMinimumSize(*self.MINIMUM_WINDOW_SIZE) # Use the new constant
         
-        # Apply modern stylesheet
-        self.setStyleSheet(get_modern_stylesheet())
+        # Apply the effective theme's palette and stylesheet before creating widgets, so they are
+        # polished once with the right one (the call at the end then only updates button texts)
+        self.apply_theme()
         
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
@@ -1231,11 +1685,13 @@ class FeedbackUI(QMainWindow):
         self.console_group.setMinimumHeight(200)
 
         # Log text area
-        self.log_text = QTextEdit()
+        # Plain text: command output is never rich text, and appending skips the rich text detection/layout
+        self.log_text = QPlainTextEdit()
         self.log_text.setReadOnly(True)
-        font = QFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
-        font.setPointSize(9)
-        self.log_text.setFont(font)
+        self.log_text.setUndoRedoEnabled(False)
+        # Let Qt drop the oldest lines of long-running command output
+        self.log_text.setMaximumBlockCount(self.LOG_VIEW_MAX_LINES)
+        self.log_text.setFont(get_log_font())
         console_layout_internal.addWidget(self.log_text)
 
         # Clear button
@@ -1371,6 +1827,8 @@ class FeedbackUI(QMainWindow):
         self.file_layout.setContentsMargins(12, 8, 12, 8)
         self.file_layout.setSpacing(12)
         self.file_layout.setAlignment(Qt.AlignLeft)
+        # Stretch to push items to the left (flex-start behavior); previews are inserted before it
+        self.file_layout.addStretch()
         
         feedback_layout.addWidget(self.file_preview_container)
         
@@ -1397,7 +1855,7 @@ class FeedbackUI(QMainWindow):
         self.bottom_path_label.mousePressEvent = lambda event: self._toggle_project_path_display()
         layout.addWidget(self.bottom_path_label)
         
-        # Apply the theme after all widgets are created
+        # Refresh the theme-dependent button texts now that all widgets are created
         self.apply_theme()
 
     def _toggle_command_section(self):
@@ -1409,16 +1867,21 @@ class FeedbackUI(QMainWindow):
             self.restore_default_window_size()
         else:
             self.toggle_command_button.setText(self.text_manager.get_text('buttons', 'hide_command_section'))
-            # When closing command section, only adjust window size
-            new_height = self.centralWidget().sizeHint().height()
-            current_width = self.width()
-            self.resize(current_width, new_height)
+            # When closing command section, only adjust window size; deferred so Qt lays out the
+            # hidden section once, instead of a forced synchronous pass for the size hint
+            QTimer.singleShot(0, self._fit_height_to_content)
 
         # Immediately save the visibility state for this project
         self.settings.beginGroup(self.project_group_name)
         self.settings.setValue("commandSectionVisible", self.command_group.isVisible())
         self.settings.endGroup()
 
+    def _fit_height_to_content(self):
+        """Shrink the window to the content height after the command section was hidden."""
+        # The section may have been shown again before this ran
+        if not self.command_group.isVisible():
+            self.resize(self.width(), self.centralWidget().sizeHint().height())
+
     def restore_default_window_size(self):
         """Restore the window to its default size based on command section visibility."""
         screen = QApplication.primaryScreen().geometry()
@@ -1443,13 +1906,16 @@ class FeedbackUI(QMainWindow):
         if is_dark is None:
             is_dark = self.is_dark_theme
         
-        app = QApplication.instance()
-        if is_dark:
-            app.setPalette(get_dark_mode_palette(app))
-            self.setStyleSheet(get_modern_stylesheet())
-        else:
-            app.setPalette(get_light_mode_palette(app))
-            self.setStyleSheet(get_light_stylesheet())
+        # Re-setting an unchanged stylesheet still restyles the whole widget tree, so only do it on a real change
+        if is_dark != self._applied_dark_theme:
+            app = QApplication.instance()
+            if is_dark:
+                app.setPalette(get_dark_mode_palette(app))
+                self.setStyleSheet(get_modern_stylesheet())
+            else:
+                app.setPalette(get_light_mode_palette(app))
+                self.setStyleSheet(get_light_stylesheet())
+            self._applied_dark_theme = is_dark
         
         self.is_dark_theme = is_dark
         
@@ -1485,8 +1951,7 @@ class FeedbackUI(QMainWindow):
         # Start or stop theme monitoring based on mode
         if hasattr(self, 'theme_timer'):
             if self.theme_mode == "auto":
-                if not self.theme_timer.isActive():
-                    self.theme_timer.start(3000)
+                self._start_theme_polling()
             else:
                 self.theme_timer.stop()
 
@@ -1527,18 +1992,7 @@ class FeedbackUI(QMainWindow):
 
     def show_notification_banner(self, message: str):
         """Show a beautiful notification banner at the top of the window."""
-        # Remove existing banner if any
-        if self.notification_banner:
-            self.notification_banner.deleteLater()
-        
-        # Create notification banner
-        self.notification_banner = QLabel(message)
-        self.notification_banner.setParent(self)
-        self.notification_banner.setAlignment(Qt.AlignCenter)
-        self.notification_banner.setWordWrap(True)
-        
-        # Apply CSS class for styling
-        self.notification_banner.setProperty("class", "notification-banner")
+        self.notification_banner.setText(message)
         
         # Position banner at top center
         self.notification_banner.adjustSize()
@@ -1549,17 +2003,16 @@ class FeedbackUI(QMainWindow):
         y = 20  # 20px from top
         
         self.notification_banner.setGeometry(x, y, banner_width, banner_height)
+        # Keep it above the central widget, which was created after the banner
+        self.notification_banner.raise_()
         self.notification_banner.show()
         
         # Auto-hide after 4 seconds with fade effect
-        QTimer.singleShot(4000, self.hide_notification_banner)
+        self._banner_timer.start(4000)
     
     def hide_notification_banner(self):
-        """Hide and remove the notification banner."""
-        if self.notification_banner:
-            self.notification_banner.hide()
-            self.notification_banner.deleteLater()
-            self.notification_banner = None
+        """Hide the notification banner."""
+        self.notification_banner.hide()
 
     def update_language_button(self):
         """Update language button text."""
@@ -1583,6 +2036,10 @@ class FeedbackUI(QMainWindow):
     
     def _apply_stay_on_top(self):
         """Apply stay on top setting to the window."""
+        # Changing window flags recreates the native window, so skip it when the hint already matches
+        if bool(self.windowFlags() & Qt.WindowStaysOnTopHint) == self.stay_on_top:
+            return
+        
         # Get current window state
         was_visible = self.isVisible()
         current_pos = self.pos()
@@ -1591,19 +2048,8 @@ class FeedbackUI(QMainWindow):
         # Store the currently focused widget to restore focus later
         focused_widget = self.focusWidget()
         
-        # Update window flags
-        flags = self.windowFlags()
-        if self.stay_on_top:
-            flags |= Qt.WindowStaysOnTopHint
-        else:
-            flags &= ~Qt.WindowStaysOnTopHint
-        
-        # Apply new flags with minimal flicker
-        if was_visible:
-            # Temporarily hide to avoid flicker
-            self.hide()
-        
-        self.setWindowFlags(flags)
+        # Update the single flag; this hides the window until it is shown again
+        self.setWindowFlag(Qt.WindowStaysOnTopHint, self.stay_on_top)
         
         # Restore position and size
         self.move(current_pos)
@@ -1622,10 +2068,10 @@ class FeedbackUI(QMainWindow):
     def _add_file(self):
         """Open file dialog to select a file (image or text)."""
         # Check file limits before opening dialog
-        images_count = len(self.feedback_text.get_images())
-        text_files_count = len(self.feedback_text.get_text_files())
+        images_count = len(self.feedback_text.images)
+        text_files_count = len(self.feedback_text.text_files)
         
-        if images_count >= 5 and text_files_count >= 5:
+        if images_count >= MAX_IMAGES and text_files_count >= MAX_TEXT_FILES:
             self._show_error_message("max_files_reached")
             return
         
@@ -1633,46 +2079,21 @@ class FeedbackUI(QMainWindow):
         file_dialog.setWindowTitle(self.text_manager.get_text('messages', 'select_file'))
         file_dialog.setFileMode(QFileDialog.ExistingFile)
         
-        # Comprehensive file filter
-        file_filter = (
-            "All Supported Files ("
-            "*.png *.jpg *.jpeg *.gif *.bmp *.webp "  # Images
-            "*.py *.pyw *.pyi *.js *.jsx *.ts *.tsx *.mjs *.cjs "  # Python, JavaScript/TypeScript
-            "*.java *.c *.cpp *.cxx *.cc *.h *.hpp *.hxx *.cs *.csx "  # Java, C/C++, C#
-            "*.go *.rs *.swift *.kt *.kts *.scala *.sc *.rb *.rbw "  # Go, Rust, Swift, Kotlin, Scala, Ruby
-            "*.php *.phtml *.pl *.pm *.r *.R *.m *.lua *.dart *.mm "  # PHP, Perl, R, MATLAB, Lua, Dart, Objective-C++
-            "*.html *.htm *.xhtml *.css *.scss *.sass *.less *.styl "  # Web files
-            "*.xml *.xsl *.xsd *.json *.jsonc *.yaml *.yml *.toml "  # Data files
-            "*.sh *.bash *.zsh *.fish *.ps1 *.bat *.cmd *.sql *.graphql *.gql "  # Scripts
-            "*.md *.markdown *.mdown *.mdx *.rst *.tex *.cls *.sty *.txt *.text *.log "  # Documents
-            "*.ini *.cfg *.conf *.properties *.env *.environment "  # Config files
-            ");;"
-            "Images (*.png *.jpg *.jpeg *.gif *.bmp *.webp);;"
-            "Source Code ("
-            "*.py *.pyw *.pyi *.js *.jsx *.ts *.tsx *.mjs *.cjs *.java *.c *.cpp *.cxx *.cc *.h *.hpp *.hxx "
-            "*.cs *.csx *.go *.rs *.swift *.kt *.kts *.scala *.sc *.rb *.rbw *.php *.phtml *.pl *.pm "
-            "*.r *.R *.m *.lua *.dart *.mm"
-            ");;"
-            "Web Files (*.html *.htm *.xhtml *.css *.scss *.sass *.less *.styl *.xml *.xsl *.xsd *.json *.jsonc *.yaml *.yml *.toml);;"
-            "Scripts (*.sh *.bash *.zsh *.fish *.ps1 *.bat *.cmd *.sql *.graphql *.gql);;"
-            "Documents (*.md *.markdown *.mdown *.mdx *.rst *.tex *.cls *.sty *.txt *.text *.log);;"
-            "Config Files (*.ini *.cfg *.conf *.properties *.env *.environment)"
-        )
-        
-        file_dialog.setNameFilter(file_filter)
+        file_dialog.setNameFilter(_FILE_DIALOG_FILTER)
         
         if file_dialog.exec():
             selected_files = file_dialog.selectedFiles()
             if selected_files:
                 file_path = selected_files[0]
                 # Automatically detect file type and handle accordingly
-                if self.feedback_text._is_image_file(file_path):
-                    if images_count >= 5:
+                file_kind = self.feedback_text._get_file_kind(file_path)
+                if file_kind == "image":
+                    if images_count >= MAX_IMAGES:
                         self._show_error_message("max_images_reached")
                         return
                     self.feedback_text._handle_image_file(file_path)
-                elif self.feedback_text._is_text_file(file_path):
-                    if text_files_count >= 5:
+                elif file_kind == "text":
+                    if text_files_count >= MAX_TEXT_FILES:
                         self._show_error_message("max_text_files_reached")
                         return
                     self.feedback_text._handle_text_file(file_path)
@@ -1711,58 +2132,99 @@ class FeedbackUI(QMainWindow):
         error_message = self.text_manager.get_text('messages', error_key)
         QMessageBox.warning(self, "Error", error_message)
     
+    def _schedule_preview_update(self):
+        """Coalesce preview refreshes so several files added in a row cause a single rebuild."""
+        if not self._preview_update_pending:
+            self._preview_update_pending = True
+            QTimer.singleShot(0, self._flush_preview_update)
+    
+    def _flush_preview_update(self):
+        """Run the deferred preview refresh."""
+        self._preview_update_pending = False
+        self._update_file_previews()
+    
     def _update_file_previews(self):
         """Update the file preview area with horizontal flex-like layout."""
-        # Clear existing preview widgets
-        for widget in self.file_preview_widgets:
+        # Get current files from feedback_text
+        images = self.feedback_text.get_images()
+        text_files = self.feedback_text.get_text_files()
+        entries = [(image_data, ImagePreviewWidget) for image_data in images]
+        entries += [(text_file_data, TextFilePreviewWidget) for text_file_data in text_files]
+        
+        # Drop the widgets of removed files, keep the rest
+        current_keys = {id(file_data) for file_data, _ in entries}
+        for key in [key for key in self.file_preview_widgets if key not in current_keys]:
+            widget = self.file_preview_widgets.pop(key)
             self.file_layout.removeWidget(widget)
             widget.setParent(None)
             widget.deleteLater()
-        self.file_preview_widgets.clear()
-        
-        # Clear all items from layout
-        while self.file_layout.count():
-            item = self.file_layout.takeAt(0)
-            if item.widget():
-                item.widget().deleteLater()
-            elif item.spacerItem():
-                # Remove spacer items
-                pass
         
-        # Get current files from feedback_text
-        images = self.feedback_text.get_images()
-        text_files = self.feedback_text.get_text_files()
+        # Create widgets only for new files; images first, then text files
+        for index, (file_data, widget_class) in enumerate(entries):
+            widget = self.file_preview_widgets.get(id(file_data))
+            if widget is None:
+                widget = widget_class(file_data, self)
+                self.file_preview_widgets[id(file_data)] = widget
+                self.file_layout.insertWidget(index, widget)
+            elif self.file_layout.indexOf(widget) != index:
+                self.file_layout.removeWidget(widget)
+                self.file_layout.insertWidget(index, widget)
         
-        if images or text_files:
-            # Show preview container
-            self.file_preview_container.setVisible(True)
-            
-            # Add image preview widgets in horizontal layout
-            for image_data in images:
-                preview_widget = ImagePreviewWidget(image_data, self)
-                self.file_layout.addWidget(preview_widget)
-                self.file_preview_widgets.append(preview_widget)
-            
-            # Add text file preview widgets in horizontal layout
-            for text_file_data in text_files:
-                preview_widget = TextFilePreviewWidget(text_file_data, self)
-                self.file_layout.addWidget(preview_widget)
-                self.file_preview_widgets.append(preview_widget)
-            
-            # Add stretch to push items to the left (flex-start behavior)
-            self.file_layout.addStretch()
-        else:
-            # Hide preview container if no files
-            self.file_preview_container.setVisible(False)
-
-
+        # Show preview container only if there are files
+        self.file_preview_container.setVisible(bool(entries))
 
     def _update_config(self):
         self.config["run_command"] = self.command_entry.text()
         self.config["execute_automatically"] = self.auto_check.isChecked()
 
+    def _install_icon(self, icon_path: str = _ICON_PATH):
+        """Set the window and application icon, once per process; deferred from __init__ to keep it off the first paint."""
+        app = QApplication.instance()
+        if app and not app.windowIcon().isNull():
+            return
+        # 设置窗口图标，添加存在性检查和调试信息
+        logger.debug("Looking for icon at: %s", icon_path)
+        if os.path.exists(icon_path):
+            logger.debug("Icon file exists")
+            icon = QIcon(icon_path)
+            if not icon.isNull():
+                self.setWindowIcon(icon)
+                # 在macOS上设置应用程序图标到Dock
+                if app:
+                    app.setWindowIcon(icon)
+                    if sys.platform == "darwin":
+                        # macOS上设置应用程序图标
+                        app.setApplicationDisplayName("Interactive Feedback")
+                logger.debug("Icon loaded successfully and set for application")
+            else:
+                logger.warning("Icon file exists but failed to load: %s", icon_path)
+        else:
+            logger.warning("Icon file not found: %s", icon_path)
+            # 列出当前目录内容以便调试
+            if logger.isEnabledFor(logging.DEBUG):
+                images_dir = os.path.join(_SCRIPT_DIR, "images")
+                if os.path.exists(images_dir):
+                    logger.debug("Images directory contents: %s", os.listdir(images_dir))
+                else:
+                    logger.debug("Images directory not found: %s", images_dir)
+
     def _get_system_theme_is_dark(self) -> bool:
         """Detect if system is using dark theme."""
+        # Qt knows the system color scheme in-process on most platforms
+        color_scheme = QApplication.styleHints().colorScheme()
+        if color_scheme != Qt.ColorScheme.Unknown:
+            return color_scheme == Qt.ColorScheme.Dark
+        
+        # Otherwise ask the system, reusing a recent answer instead of spawning subprocesses on every check
+        now = time.monotonic()
+        if self._system_theme_cache and now - self._system_theme_cache[0] < self.SYSTEM_THEME_CACHE_SECONDS:
+            return self._system_theme_cache[1]
+        is_dark = self._query_system_theme_is_dark()
+        self._system_theme_cache = (now, is_dark)
+        return is_dark
+
+    def _query_system_theme_is_dark(self) -> bool:
+        """Query the platform for dark theme when Qt can't report the color scheme."""
         try:
             if sys.platform == "darwin":  # macOS
                 # Try multiple methods for macOS
@@ -1817,31 +2279,87 @@ class FeedbackUI(QMainWindow):
             return False
 
     def _append_log(self, text: str):
-        self.log_buffer.append(text)
-        self.log_text.append(text.rstrip())
-        cursor = self.log_text.textCursor()
-        cursor.movePosition(QTextCursor.End)
-        self.log_text.setTextCursor(cursor)
-
-    def _check_process_status(self):
-        if self.process and self.process.poll() is not None:
-            # Process has terminated
-            exit_code = self.process.poll()
-            self._append_log(self.text_manager.get_text('messages', 'process_exited', code=exit_code))
-            self.run_button.setText(self.text_manager.get_text('buttons', 'run'))
-            self.process = None
-            self.activateWindow()
-            self.feedback_text.setFocus()
+        # Buffer line by line so the cap bounds the kept output however the reads were chunked
+        self.log_buffer.extend(text.splitlines(keepends=True))
+        # Batch console writes so chatty commands don't relayout the log once per line
+        if not self._pending_log:
+            QTimer.singleShot(self.LOG_FLUSH_INTERVAL_MS, self._flush_log)
+        # Command output arrives as several lines at once; each is shown right-stripped
+        self._pending_log.extend(line.rstrip() for line in (text.splitlines() or [""]))
+    
+    def _flush_log(self):
+        """Write the batched lines to the console; it keeps following the output while scrolled to the end."""
+        if not self._pending_log:
+            return
+        self.log_text.appendPlainText("\n".join(self._pending_log))
+        self._pending_log.clear()
+
+    def _on_process_finished(self, process: subprocess.Popen, exit_code: int):
+        # Ignore processes that were already stopped or replaced
+        if process is not self.process:
+            return
+        # Show the output already buffered before the exit message; background children may still
+        # hold the pipe open, so the watchers keep reading until EOF
+        for pipe, notifier, decoder in list(self._pipe_watchers):
+            self._read_pipe(pipe, notifier, decoder, drain=True)
+        self._append_log(self.text_manager.get_text('messages', 'process_exited', code=exit_code))
+        self.run_button.setText(self.text_manager.get_text('buttons', 'run'))
+        self.process = None
+        self.activateWindow()
+        self.feedback_text.setFocus()
+
+    def _watch_pipe(self, pipe: io.BufferedReader):
+        """Read a command output pipe from the event loop whenever it becomes readable."""
+        os.set_blocking(pipe.fileno(), False)
+        notifier = QSocketNotifier(pipe.fileno(), QSocketNotifier.Type.Read, self)
+        decoder = _LogLineDecoder()
+        notifier.activated.connect(lambda *_: self._read_pipe(pipe, notifier, decoder))
+        self._pipe_watchers.append((pipe, notifier, decoder))
+
+    def _read_pipe(self, pipe: io.BufferedReader, notifier: QSocketNotifier, decoder: _LogLineDecoder, drain: bool = False):
+        """Append the output available on a watched pipe; one chunk per wakeup unless draining."""
+        while notifier.isEnabled():
+            try:
+                chunk = os.read(pipe.fileno(), self.LOG_READ_CHUNK_SIZE)
+            except BlockingIOError:
+                return
+            except OSError:
+                chunk = b""
+            if not chunk:
+                # End of output: stop watching, or the notifier keeps firing on EOF
+                if rest := decoder.finish():
+                    self._append_log(rest)
+                self._close_pipe_watcher(pipe, notifier, decoder)
+                return
+            if lines := decoder.feed(chunk):
+                self._append_log(lines)
+            if not drain:
+                return
+
+    def _close_pipe_watcher(self, pipe: io.BufferedReader, notifier: QSocketNotifier, decoder: _LogLineDecoder):
+        """Stop watching a pipe and close it."""
+        notifier.setEnabled(False)
+        notifier.deleteLater()
+        pipe.close()
+        self._pipe_watchers.remove((pipe, notifier, decoder))
+
+    def _close_pipe_watchers(self):
+        """Stop watching the output of stopped commands."""
+        for watcher in list(self._pipe_watchers):
+            self._close_pipe_watcher(*watcher)
 
     def _run_command(self):
         if self.process:
-            kill_tree(self.process)
+            # Kill in the background: taskkill and waiting for the exit shouldn't freeze the window.
+            # Not a daemon thread, so quitting right away still lets the kill finish
+            threading.Thread(target=kill_tree, args=(self.process,)).start()
             self.process = None
+            self._close_pipe_watchers()
             self.run_button.setText(self.text_manager.get_text('buttons', 'run'))
             return
 
         # Clear the log buffer but keep UI logs visible
-        self.log_buffer = []
+        self.log_buffer.clear()
 
         command = self.command_entry.text()
         if not command:
@@ -1852,40 +2370,51 @@ class FeedbackUI(QMainWindow):
         self.run_button.setText(self.text_manager.get_text('buttons', 'stop'))
 
         try:
-            self.process = subprocess.Popen(
+            process = subprocess.Popen(
                 command,
                 shell=True,
                 cwd=self.project_directory,
                 stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
+                # One pipe for both streams keeps their output in the order it was written
+                stderr=subprocess.STDOUT,
                 env=get_user_environment(),
-                text=True,
-                bufsize=1,
-                encoding="utf-8",
-                errors="ignore",
                 close_fds=True,
+                # Own process group, so kill_tree can stop the command and everything it started at once
+                start_new_session=os.name != "nt",
             )
-
-            def read_output(pipe):
-                for line in iter(pipe.readline, ""):
-                    self.log_signals.append_log.emit(line)
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stdout,),
-                daemon=True
-            ).start()
-
-            threading.Thread(
-                target=read_output,
-                args=(self.process.stderr,),
-                daemon=True
-            ).start()
-
-            # Start process status checking
-            self.status_timer = QTimer()
-            self.status_timer.timeout.connect(self._check_process_status)
-            self.status_timer.start(100)  # Check every 100ms
+            self.process = process
+
+            readers: list[threading.Thread] = []
+            if os.name == "nt":
+                # Qt can't watch pipe handles on Windows, so read the output in a background thread
+                def read_output(pipe):
+                    # Emit only whole lines, so the console never splits one across two appends
+                    decoder = _LogLineDecoder()
+                    while chunk := pipe.read1(self.LOG_READ_CHUNK_SIZE):
+                        if lines := decoder.feed(chunk):
+                            self.log_signals.append_log.emit(lines)
+                    if rest := decoder.finish():
+                        self.log_signals.append_log.emit(rest)
+
+                readers.append(threading.Thread(target=read_output, args=(process.stdout,), daemon=True))
+                for reader in readers:
+                    reader.start()
+            else:
+                # Let the event loop wake us only when output arrives
+                self._watch_pipe(process.stdout)
+
+            # Block on the exit in a thread instead of polling from the UI
+            def wait_for_exit():
+                exit_code = process.wait()
+                # Let the reader thread drain the pipe so the exit message comes after the output, but
+                # don't wait on a pipe kept open by background children for more than a second (their
+                # later output is still appended when it arrives)
+                deadline = time.monotonic() + 1
+                for reader in readers:
+                    reader.join(timeout=max(0, deadline - time.monotonic()))
+                self.log_signals.process_finished.emit(process, exit_code)
+
+            threading.Thread(target=wait_for_exit, daemon=True).start()
 
         except Exception as e:
             self._append_log(self.text_manager.get_text('messages', 'command_error', error=str(e)))
@@ -1923,6 +2452,9 @@ class FeedbackUI(QMainWindow):
         return "\n".join(summary_parts)
 
     def _submit_feedback(self):
+        # Make sure files still being processed are part of the result
+        self.feedback_text.wait_for_pending_files()
+
         # Get original feedback text (without any attachment summary)
         original_feedback = self.feedback_text.toPlainText().strip()
         
@@ -1935,8 +2467,8 @@ class FeedbackUI(QMainWindow):
         self.feedback_result = FeedbackResult(
             logs="".join(self.log_buffer),
             interactive_feedback=final_feedback,
-            images=self.feedback_text.get_images(),
-            text_files=self.feedback_text.get_text_files()
+            images=self.feedback_text.export_images(),
+            text_files=list(self.feedback_text.get_text_files())
         )
         self.close()
 
@@ -1947,7 +2479,8 @@ class FeedbackUI(QMainWindow):
             self._submit_feedback()
 
     def clear_logs(self):
-        self.log_buffer = []
+        self.log_buffer.clear()
+        self._pending_log.clear()
         self.log_text.clear()
 
     def _save_config(self):
@@ -1960,15 +2493,17 @@ class FeedbackUI(QMainWindow):
 
     def closeEvent(self, event):
         # Save general UI settings for the main window (geometry, state)
+        # Only write the values that changed since they were loaded
+        geometry = self.saveGeometry()
+        state = self.saveState()
         self.settings.beginGroup("MainWindow_General")
-        self.settings.setValue("geometry", self.saveGeometry())
-        self.settings.setValue("windowState", self.saveState())
-        self.settings.endGroup()
-
-        # Save project-specific command section visibility (this is now slightly redundant due to immediate save in toggle, but harmless)
-        self.settings.beginGroup(self.project_group_name)
-        self.settings.setValue("commandSectionVisible", self.command_group.isVisible())
+        if bytes(geometry) != self._saved_geometry:
+            self.settings.setValue("geometry", geometry)
+        if bytes(state) != self._saved_window_state:
+            self.settings.setValue("windowState", state)
         self.settings.endGroup()
+        # Command section visibility is already saved whenever it is toggled.
+        # QSettings batches the writes above with any pending ones; run() flushes them once the window is gone
 
         # Stop theme monitoring timer to prevent memory leaks
         if hasattr(self, 'theme_timer'):
@@ -1979,6 +2514,18 @@ class FeedbackUI(QMainWindow):
             kill_tree(self.process)
         super().closeEvent(event)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        # Resume theme monitoring, catching up on changes made while hidden
+        if self.theme_mode == "auto" and not self.theme_timer.isActive():
+            self._check_system_theme_change()
+            self._start_theme_polling()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        # No need to track the system theme while the window isn't visible
+        self.theme_timer.stop()
+
     def run(self) -> FeedbackResult:
         self.show()
         
@@ -1988,10 +2535,14 @@ class FeedbackUI(QMainWindow):
             self.activateWindow()
             # Give the system time to properly initialize the window and input method
             QTimer.singleShot(200, lambda: self.feedback_text.setFocus())
-            print(f"Debug: macOS window raised and activated with input method support")
+            logger.debug("macOS window raised and activated with input method support")
         
         QApplication.instance().exec()
 
+        # Write the batched settings to disk now that the window has closed, rather than relying on
+        # QSettings being destroyed before the interpreter exits
+        self.settings.sync()
+
         if self.process:
             kill_tree(self.process)
 
@@ -2000,6 +2551,12 @@ class FeedbackUI(QMainWindow):
 
         return self.feedback_result
 
+    def _start_theme_polling(self):
+        """Poll the system theme in auto mode, unless Qt reports color scheme changes itself."""
+        if (self.theme_mode == "auto" and not self.theme_timer.isActive()
+                and QApplication.styleHints().colorScheme() == Qt.ColorScheme.Unknown):
+            self.theme_timer.start(self.THEME_POLL_INTERVAL_MS)
+
     def _check_system_theme_change(self):
         """Check if system theme has changed and update if in auto mode."""
         if self.theme_mode == "auto":
@@ -2009,9 +2566,11 @@ class FeedbackUI(QMainWindow):
                 self.apply_theme()
 
 
+@functools.lru_cache(maxsize=64)
 def get_project_settings_group(project_dir: str) -> str:
     # Create a safe, unique group name from the project directory path
     # Using only the last component + hash of full path to keep it somewhat readable but unique
+    # (keep MD5: the group name is the key of settings already saved for existing projects)
     basename = os.path.basename(os.path.normpath(project_dir))
     full_hash = hashlib.md5(project_dir.encode('utf-8')).hexdigest()[:8]
     return f"{basename}_{full_hash}"
@@ -2043,6 +2602,7 @@ if __name__ == "__main__":
     parser.add_argument("--output-file", help="Path to save the feedback result as JSON")
     args = parser.parse_args()
 
+    logging.basicConfig(level=logging.WARNING, format="%(levelname)s: %(message)s")
     result = feedback_ui(args.project_directory, args.prompt, args.output_file)
     if result:
         print(f"\nLogs collected: \n{result['logs']}")
@@ -91,11 +91,35 @@ class I18NManager:
         Initialize all text dictionaries
         """
         self.texts = {}
+        self._snapshots: Dict[str, Dict[str, Dict[str, str]]] = {}
         if not os.path.exists("i18n.json"):
             raise FileNotFoundError("i18n.json not found")
         with open("i18n.json", "r", encoding="utf-8") as f:
             self.texts = json.load(f)
     
+    def snapshot(self) -> Dict[str, Dict[str, str]]:
+        """
+        获取当前语言的文本快照（已合并英文回退），按语言缓存
+        Get the current language's texts with the English fallback merged in, cached per language
+        
+        Returns:
+            Dictionary mapping category -> key -> text; do not modify
+        """
+        snapshot = self._snapshots.get(self.current_language)
+        if snapshot is None:
+            snapshot = {}
+            for category, languages in self.texts.items():
+                fallback = languages.get("en")
+                current = languages.get(self.current_language)
+                if not isinstance(fallback, dict) and not isinstance(current, dict):
+                    continue  # e.g. quick_replies, which are lists
+                merged = dict(fallback) if isinstance(fallback, dict) else {}
+                if isinstance(current, dict):
+                    merged.update(current)
+                snapshot[category] = merged
+            self._snapshots[self.current_language] = snapshot
+        return snapshot
+    
     def get_text(self, category: str, key: str, **kwargs) -> str:
         """
         获取指定类别和键的文本
@@ -110,18 +134,19 @@ class I18NManager:
             Localized text string
         """
         try:
-            text = self.texts[category][self.current_language][key]
+            # The snapshot already falls back to English for missing texts
+            text = self.snapshot()[category][key]
             if kwargs:
                 return text.format(**kwargs)
             return text
-        except KeyError:
-            # Fallback to English if current language text not found
+        except (KeyError, IndexError):
+            # Fallback to English, e.g. when a translation's placeholders don't match the arguments
             try:
                 text = self.texts[category]["en"][key]
                 if kwargs:
                     return text.format(**kwargs)
                 return text
-            except KeyError:
+            except (KeyError, IndexError):
                 # Last resort: return the key itself
                 return f"[{category}.{key}]"
     
@@ -221,6 +246,7 @@ class I18NManager:
         try:
             with open(filepath, 'r', encoding='utf-8') as f:
                 self.texts = json.load(f)
+            self._snapshots.clear()
             return True
         except Exception as e:
             print(f"Error importing texts: {e}")
@@ -41,8 +41,8 @@ echo "uv installed successfully."
 echo "Generating requirements.txt file..."
 cat <<EOL > requirements.txt
 fastmcp>=2.0.0
-psutil>=7.0.0
 pyside6>=6.8.2.1
+charset-normalizer>=3.0.0
 EOL
 echo "requirements.txt file generated."
 
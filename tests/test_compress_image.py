@@ -0,0 +1,56 @@
+import os
+import sys
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QBuffer, QIODevice
+from PySide6.QtGui import QImage
+from PySide6.QtWidgets import QApplication
+
+from feedback_ui import FeedbackTextEdit
+
+
+def make_png(side: int, alpha: int) -> bytes:
+    """Encode a side x side RGBA PNG of noise (so it doesn't compress away) with a uniform alpha."""
+    pixels = bytearray(os.urandom(side * side * 4))
+    pixels[3::4] = bytes([alpha]) * (side * side)
+    image = QImage(bytes(pixels), side, side, side * 4, QImage.Format.Format_ARGB32).copy()
+    buffer = QBuffer()
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return buffer.data().data()
+
+
+class CompressImageFormatTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.app = QApplication.instance() or QApplication([])
+        cls.edit = FeedbackTextEdit()
+
+    def assert_same_format_above_and_below_skip(self, alpha: int, expected: str):
+        small = make_png(100, alpha)
+        large = make_png(400, alpha)
+        self.assertLess(len(small), FeedbackTextEdit.SKIP_RECOMPRESS_PNG_BYTES)
+        self.assertGreater(len(large), FeedbackTextEdit.SKIP_RECOMPRESS_PNG_BYTES)
+        for data in (small, large):
+            _, image_format = self.edit._compress_image(data)
+            self.assertEqual(image_format, expected)
+            # Same answer when the caller hands over the decoded image
+            _, image_format = self.edit._compress_image(data[:64], image=QImage.fromData(data))
+            self.assertEqual(image_format, expected)
+
+    def test_opaque_rgba_png_becomes_jpeg_at_any_size(self):
+        self.assert_same_format_above_and_below_skip(255, "JPEG")
+
+    def test_transparent_png_stays_png_at_any_size(self):
+        self.assert_same_format_above_and_below_skip(128, "PNG")
+
+    def test_small_transparent_png_is_kept_as_is(self):
+        data = make_png(100, 128)
+        self.assertIs(self.edit._compress_image(data)[0], data)
+
+
+if __name__ == "__main__":
+    unittest.main()